@@ -2,8 +2,11 @@ from telegram import Update
 from telegram.ext import ContextTypes
 
 from bot.handlers.registry import command
+from bot.services.access import reset_limit
+from bot.services.revalidate import revalidate_stats
 from constants import OWNER_ID
-from db import reset_user_limit
+from db import get_article_cache_info, negative_cache_stats
+from fetch import http_cache_stats, get_queue_depths
 from script import main as script_main
 
 
@@ -12,7 +15,7 @@ async def reborn(update: Update, _: ContextTypes.DEFAULT_TYPE):
     if update.effective_user.id != OWNER_ID:
         return
 
-    await reset_user_limit(OWNER_ID)
+    await reset_limit(OWNER_ID)
 
     await update.message.reply_text("Reborn OK")
 
@@ -29,3 +32,35 @@ async def release(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Release finished OK")
     except Exception as e:
         await update.message.reply_text(f"Release failed: {e}")
+
+
+@command("stats")
+async def stats(update: Update, _: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != OWNER_ID:
+        return
+
+    article_cache = get_article_cache_info()
+
+    lines = [
+        "HTTP cache: "
+        f"hit={http_cache_stats['hit']}, "
+        f"304={http_cache_stats['not_modified']}, "
+        f"miss={http_cache_stats['miss']}",
+        "HTTP queues: " + (
+            ", ".join(f"{host}={depth}" for host, depth in sorted(get_queue_depths().items())) or "-"
+        ),
+        "Article LRU: "
+        f"{article_cache['size']}/{article_cache['max_size']}, "
+        f"hit={article_cache.get('hit', 0)}, "
+        f"stale={article_cache.get('stale', 0)}, "
+        f"miss={article_cache.get('miss', 0)}",
+        "Revalidate: "
+        f"updated={revalidate_stats['updated']}, "
+        f"unchanged={revalidate_stats['unchanged']}, "
+        f"failed={revalidate_stats['failed']}",
+        "Negative cache: " + (
+            ", ".join(f"{reason}={count}" for reason, count in sorted(negative_cache_stats.items())) or "-"
+        ),
+    ]
+
+    await update.message.reply_text("\n".join(lines))
@@ -9,6 +9,7 @@ from bot.keyboards.common import get_more_random_keyboard, get_retry_keyboard
 from bot.keyboards.disambig import build_disambig_nav_keyboard
 from bot.services.article import handle_article
 from bot.services.disambig import get_session, get_disambig_keyboard_from_session
+from bot.services.prewarm import pop_warm_title
 from bot.services.render import notify
 from db import get_lang, set_lang, get_random_featured_title
 from i18n import translate, TKey
@@ -90,7 +91,7 @@ async def more_random(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     lang_val = await get_user_lang(uid, query.from_user.language_code)
 
-    title = await get_random_featured_title(lang_val)
+    title = pop_warm_title(lang_val, uid) or await get_random_featured_title(lang_val, uid)
 
     finished = asyncio.Event()
     finished_bad = asyncio.Event()
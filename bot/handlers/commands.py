@@ -8,7 +8,9 @@ from bot.handlers.registry import command
 from bot.handlers.workers import processing_message_worker
 from bot.keyboards.common import get_more_random_keyboard, get_retry_keyboard
 from bot.keyboards.lang import get_lang_keyboard
+from bot.services.access import get_used_limit
 from bot.services.article import handle_article
+from bot.services.prewarm import pop_warm_title
 from bot.state.user_state import (
     STATE_GET,
     STATE_UPDATE,
@@ -29,7 +31,6 @@ from constants import (
 from db import (
     get_lang,
     set_lang,
-    get_user_limit,
     get_random_featured_title,
 )
 from i18n import translate, TKey, TRANSLATIONS
@@ -80,7 +81,7 @@ async def status(update: Update, _: ContextTypes.DEFAULT_TYPE):
 async def limit(update: Update, _: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
 
-    used = await get_user_limit(user_id)
+    used = await get_used_limit(user_id)
     lang = await get_user_lang(user_id, update.effective_user.language_code)
 
     await update.message.reply_text(
@@ -113,7 +114,7 @@ async def cmd_lang(update: Update, _: ContextTypes.DEFAULT_TYPE):
 async def random(update: Update, context: ContextTypes.DEFAULT_TYPE):
     uid = update.effective_user.id
     lang_val = await get_user_lang(uid, update.effective_user.language_code)
-    title = await get_random_featured_title(lang_val)
+    title = pop_warm_title(lang_val, uid) or await get_random_featured_title(lang_val, uid)
 
     finished = asyncio.Event()
     finished_bad = asyncio.Event()
@@ -160,7 +161,7 @@ async def get_cmd(update: Update, _: ContextTypes.DEFAULT_TYPE):
     uid = update.effective_user.id
     lang_val = await get_user_lang(uid, update.effective_user.language_code)
 
-    used = await get_user_limit(uid)
+    used = await get_used_limit(uid)
 
     if used >= DAILY_USER_LIMIT:
         await update.message.reply_text(
@@ -180,7 +181,7 @@ async def update_cmd(update: Update, _: ContextTypes.DEFAULT_TYPE):
     uid = update.effective_user.id
     lang_val = await get_user_lang(uid, update.effective_user.language_code)
 
-    used = await get_user_limit(uid)
+    used = await get_used_limit(uid)
 
     if used >= DAILY_USER_LIMIT:
         await update.message.reply_text(
@@ -2,7 +2,10 @@ from telegram import Update
 from telegram.ext import ContextTypes
 
 from bot.handlers.registry import callback
-from bot.services.article import handle_article
+from bot.services.access import check_access
+from bot.services.reading import render_reading_page
+from bot.services.render import notify
+from i18n import translate
 
 
 @callback("^reading\\|")
@@ -17,27 +20,6 @@ async def reading_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if data[1] == "page_info":
         return
 
-    # reading|start|lang|title
-    if data[1] == "start":
-        lang = data[2]
-        title = data[3]
-
-        page = 0
-
-        await handle_article(
-            update=update,
-            context=context,
-            title=title,
-            lang_val=lang,
-            uid=query.from_user.id,
-            check_limit=False,
-            chat_id=query.message.chat.id,
-            page=page,
-            reading=True,
-        )
-
-        return
-
     # reading|back|lang|title
     if data[1] == "back":
         msg = update.effective_message
@@ -47,20 +29,25 @@ async def reading_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         return
 
-    # reading|<page>|lang|title
-    page = int(data[1])
+    # reading|start|lang|title — новое сообщение с первой страницей
+    # reading|<page>|lang|title — смена страницы в текущем сообщении
+    start = data[1] == "start"
+    page = 0 if start else int(data[1])
     lang = data[2]
     title = data[3]
 
-    await handle_article(
-        update=update,
-        context=context,
-        title=title,
-        lang_val=lang,
-        uid=query.from_user.id,
+    # как и прежде (check_limit=False): режим чтения не списывает дневную квоту
+    ok, reason = await check_access(context, query.from_user.id, decrease=False)
+    if not ok:
+        await notify(update, translate(lang, reason))
+        return
+
+    # страницы берутся из заранее разбитой статьи (ReadingSession), без повторной загрузки
+    await render_reading_page(
+        context,
         chat_id=query.message.chat.id,
-        check_limit=False,
-        edit_message=query.message,
+        lang=lang,
+        title=title,
         page=page,
-        reading=True,
+        edit_message=None if start else query.message,
     )
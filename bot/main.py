@@ -14,9 +14,14 @@ from telegram.ext import (
 
 from bot.handlers.registry import get_handlers
 from bot.handlers.text import handle_text
-from constants import DB_NAME, DB_TEST_NAME, WATCHDOG_SLEEP_TIME, DEAD_TIMEOUT, RESTART_COOLDOWN, BOT_PROCESS_NAME
+from bot.services.prewarm import prewarm_worker
+from bot.services.quota import load_quota, flush_quota, quota_flush_worker
+from bot.services.revalidate import revalidate_worker
+from constants import QUOTA_IN_MEMORY, DB_NAME, DB_TEST_NAME, WATCHDOG_SLEEP_TIME, DEAD_TIMEOUT, RESTART_COOLDOWN, BOT_PROCESS_NAME
 from db import init_db, close_db, has_featured_articles, update_featured_articles_in_db, update_process_heartbeat, \
-    delete_process_heartbeat
+    delete_process_heartbeat, flush_article_hits
+from executor import shutdown_executor
+from fetch import init_http, close_http
 from i18n import TRANSLATIONS
 from models import get_app
 from parsers import fetch_featured_titles
@@ -126,6 +131,15 @@ def main():
         await init_db(DB_TEST_NAME if is_test else DB_NAME)
         logger.info("[INIT] database initialized")
 
+        await init_http()
+        logger.info("[INIT] HTTP session initialized")
+
+        if QUOTA_IN_MEMORY:
+            await load_quota()
+            task = asyncio.create_task(quota_flush_worker())
+            app.bot_data["quota_task"] = task
+            logger.info("[INIT] quota restored, flush task started")
+
         heartbeat_task = asyncio.create_task(heartbeat())
         app.bot_data["heartbeat_task"] = heartbeat_task
         logger.info("[INIT] heartbeat task started")
@@ -154,6 +168,14 @@ def main():
             except Exception as exc:
                 logger.exception("[INIT] error lang=%s: %s", lang, exc)
 
+        task = asyncio.create_task(prewarm_worker())
+        app.bot_data["prewarm_task"] = task
+        logger.info("[INIT] prewarm task started")
+
+        task = asyncio.create_task(revalidate_worker())
+        app.bot_data["revalidate_task"] = task
+        logger.info("[INIT] revalidate task started")
+
         logger.info("[INIT] completed successfully")
 
     async def post_shutdown(_: Application):
@@ -183,6 +205,48 @@ def main():
 
             logger.info("[SHUTDOWN] watchdog stopped")
 
+        task = app.bot_data.get("prewarm_task")
+
+        if task:
+            logger.info("[SHUTDOWN] cancelling prewarm task")
+            task.cancel()
+
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+            logger.info("[SHUTDOWN] prewarm stopped")
+
+        task = app.bot_data.get("revalidate_task")
+
+        if task:
+            logger.info("[SHUTDOWN] cancelling revalidate task")
+            task.cancel()
+
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+            try:
+                await flush_article_hits()
+            except Exception:
+                logger.exception("[SHUTDOWN] article hits flush failed")
+
+            logger.info("[SHUTDOWN] revalidate stopped")
+
+        task = app.bot_data.get("quota_task")
+
+        if task:
+            logger.info("[SHUTDOWN] cancelling quota flush task")
+            task.cancel()
+
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+            try:
+                await flush_quota()
+                logger.info("[SHUTDOWN] quota flushed")
+            except Exception:
+                logger.exception("[SHUTDOWN] quota flush failed")
+
         req = app.bot_data["bot_request"]
         poll = app.bot_data["polling_request"]
 
@@ -190,6 +254,8 @@ def main():
 
         await req.shutdown()
         await poll.shutdown()
+        await close_http()
+        shutdown_executor()
 
         await close_db()
         logger.info("[SHUTDOWN] database closed")
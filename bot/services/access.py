@@ -2,8 +2,9 @@ import time
 
 from telegram.ext import ContextTypes
 
-from constants import SPAM_INTERVAL, DAILY_TOTAL_LIMIT, DAILY_USER_LIMIT, CHANNEL_USERNAME
-from db import get_pool
+from bot.services.quota import try_consume, get_used, reset_user_quota, today
+from constants import SPAM_INTERVAL, DAILY_TOTAL_LIMIT, DAILY_USER_LIMIT, CHANNEL_USERNAME, QUOTA_IN_MEMORY
+from db import get_pool, get_user_limit, reset_user_limit
 from i18n import TKey
 
 user_last_request_time = {}
@@ -20,56 +21,40 @@ def is_spam(user_id: int) -> bool:
     return False
 
 
+async def consume_quota(user_id: int) -> tuple[bool, int, int]:
+    """
+    Проверка и списание дневной квоты одним запросом (функция consume_quota в schema.sql).
+    Возвращает (разрешено, осталось пользователю, осталось всего).
+    """
+    row = await get_pool().fetchrow(
+        "SELECT * FROM consume_quota($1, $2, $3, $4)",
+        user_id,
+        DAILY_USER_LIMIT,
+        DAILY_TOTAL_LIMIT,
+        today(),
+    )
+    return row["allowed"], row["user_remaining"], row["total_remaining"]
+
+
 async def check_and_increment_limit(user_id: int) -> bool:
-    pool = get_pool()
-
-    async with pool.acquire() as conn:
-        async with conn.transaction():
-
-            # --- global limit ---
-            total_row = await conn.fetchrow(
-                "SELECT total FROM global_limits WHERE date = CURRENT_DATE"
-            )
-            total = total_row["total"] if total_row else 0
-
-            if total >= DAILY_TOTAL_LIMIT:
-                return False
-
-            # --- user limit ---
-            user_row = await conn.fetchrow(
-                """
-                SELECT count FROM user_limits
-                WHERE user_id=$1 AND date=CURRENT_DATE
-                """,
-                user_id
-            )
-            user_count = user_row["count"] if user_row else 0
-
-            if user_count >= DAILY_USER_LIMIT:
-                return False
-
-            # --- increment user ---
-            await conn.execute(
-                """
-                INSERT INTO user_limits(user_id, date, count)
-                VALUES($1, CURRENT_DATE, 1)
-                ON CONFLICT (user_id, date)
-                DO UPDATE SET count = user_limits.count + 1
-                """,
-                user_id
-            )
-
-            # --- increment global ---
-            await conn.execute(
-                """
-                INSERT INTO global_limits(date, total)
-                VALUES(CURRENT_DATE, 1)
-                ON CONFLICT (date)
-                DO UPDATE SET total = global_limits.total + 1
-                """
-            )
-
-            return True
+    if QUOTA_IN_MEMORY:
+        allowed, _, _ = try_consume(user_id)
+    else:
+        allowed, _, _ = await consume_quota(user_id)
+    return allowed
+
+
+async def get_used_limit(user_id: int) -> int:
+    if QUOTA_IN_MEMORY:
+        return get_used(user_id)
+    return await get_user_limit(user_id, today())
+
+
+async def reset_limit(user_id: int):
+    if QUOTA_IN_MEMORY:
+        await reset_user_quota(user_id)
+    else:
+        await reset_user_limit(user_id, today())
 
 
 async def is_subscribed(context: ContextTypes.DEFAULT_TYPE, user_id: int) -> bool:
@@ -21,7 +21,6 @@ async def handle_article(
         use_cache=True,
         edit_message=None,
         page=0,
-        reading=False,
 ):
     notify_text = None
     ok, ctx_req = True, None
@@ -41,8 +40,8 @@ async def handle_article(
             use_cache
         )
 
-        # кеш → сразу отправляем без лимита
-        if ctx_req.cached:
+        # кеш (или недавняя неудача из negative_cache) → сразу отвечаем без лимита
+        if ctx_req.cached or ctx_req.negative:
             return
 
         # лимит
@@ -65,7 +64,6 @@ async def handle_article(
                     ctx_req=ctx_req,
                     edit_message=edit_message,
                     page=page,
-                    reading=reading,
                 )
             except BadRequest as exc:
                 # Проверяем, что ошибка вызвана именно невалидными данными кнопки
@@ -81,7 +79,6 @@ async def handle_article(
                         ctx_req=ctx_req,
                         edit_message=edit_message,
                         page=page,
-                        reading=reading,
                         add_reading_button=False,
                     )
                 else:
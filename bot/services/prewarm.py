@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from collections import deque
+
+from constants import PREWARM_QUEUE_SIZE, PREWARM_INTERVAL, PREWARM_IDLE
+from db import get_random_featured_title, get_recent_random
+from fetch import get_queue_depths
+from i18n import TRANSLATIONS
+from models import get_config
+from parse import get_article, get_ctx_req_by_config
+
+logger = logging.getLogger(__name__)
+
+# lang -> заголовки случайных избранных статей, уже лежащих в articles_cache (с картинкой)
+_warm: dict[str, deque[str]] = {lang: deque() for lang in TRANSLATIONS.keys()}
+
+
+def pop_warm_title(lang: str, user_id: int) -> str | None:
+    """
+    Готовая случайная статья для /random (без тех, что пользователь недавно видел).
+    """
+    queue = _warm.get(lang)
+    if not queue:
+        return None
+
+    recent = get_recent_random(user_id)
+
+    for title in queue:
+        if title not in recent:
+            queue.remove(title)
+            recent.append(title)
+            return title
+
+    return None
+
+
+def _push_warm(lang: str, title: str):
+    # одновременные _warm_one могут выбрать один и тот же заголовок
+    if title not in _warm[lang]:
+        _warm[lang].append(title)
+
+
+async def _warm_one(lang: str) -> bool:
+    """
+    Загружает одну случайную статью в articles_cache. True — был запрос к Википедии.
+    """
+    title = await get_random_featured_title(lang)
+    if not title or title in _warm[lang]:
+        return False
+
+    cfg = await get_config(None, title, lang)
+    ctx_req = await get_ctx_req_by_config(cfg)
+
+    if ctx_req.cached:
+        _push_warm(lang, title)
+        return False
+
+    article, _ = await get_article(cfg, ctx_req=ctx_req)
+
+    # в очередь — только то, что /random потом возьмёт из кеша
+    if article and not article.is_disambig and (await get_ctx_req_by_config(cfg)).cached:
+        _push_warm(lang, title)
+
+    return True
+
+
+async def prewarm_worker():
+    """
+    Фоновый производитель: держит по PREWARM_QUEUE_SIZE готовых статей на язык.
+    Пользовательские запросы важнее — пока к хосту есть очередь, прогрев ждёт.
+    """
+    while True:
+        refilled = False
+
+        for lang, queue in _warm.items():
+            if len(queue) >= PREWARM_QUEUE_SIZE:
+                continue
+
+            if get_queue_depths().get(f"{lang}.wikipedia.org"):
+                continue
+
+            size = len(queue)
+
+            # недостающие статьи языка грузятся одновременно: их страницы File: уходят к API одним запросом
+            results = await asyncio.gather(
+                *(_warm_one(lang) for _ in range(PREWARM_QUEUE_SIZE - size)),
+                return_exceptions=True,
+            )
+
+            fetched = False
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("prewarm failed for lang=%s", lang, exc_info=result)
+                fetched = fetched or result is not False
+
+            refilled = refilled or len(queue) > size
+
+            if fetched:
+                await asyncio.sleep(PREWARM_INTERVAL)
+
+        if not refilled:
+            await asyncio.sleep(PREWARM_IDLE)
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from datetime import date
+
+from constants import DAILY_TOTAL_LIMIT, DAILY_USER_LIMIT, QUOTA_FLUSH_INTERVAL
+from db import get_limits, add_limits, reset_user_limit
+from utils import get_today
+
+logger = logging.getLogger(__name__)
+
+# Счётчики за сегодня живут в памяти процесса бота: проверка лимита не ходит в БД,
+# а приращения копятся в _pending и пачкой записываются в user_limits / global_limits.
+# Рассчитано на один процесс бота — другие процессы квоту не списывают.
+
+_day: date | None = None
+_total = 0
+_user_counts: dict[int, int] = {}
+
+# день -> {user_id: ещё не записанное приращение}
+_pending: defaultdict[date, Counter[int]] = defaultdict(Counter)
+
+_flush_lock = asyncio.Lock()
+
+
+def today() -> date:
+    # тот же день по UTC, что и у остального бота (utils.get_today)
+    return date.fromisoformat(get_today())
+
+
+async def load_quota():
+    """
+    Восстановление сегодняшних счётчиков из БД (вызывать при старте бота).
+    """
+    global _day, _total, _user_counts
+
+    _day = today()
+    _total, _user_counts = await get_limits(_day)
+    _pending.clear()
+
+    logger.info("quota restored: total=%s, users=%s", _total, len(_user_counts))
+
+
+def _rollover():
+    # новый день — счётчики с нуля, неотправленное за прошлый день остаётся в _pending
+    global _day, _total, _user_counts
+
+    day = today()
+    if _day == day:
+        return
+
+    _day = day
+    _total = 0
+    _user_counts = {}
+
+
+def try_consume(user_id: int) -> tuple[bool, int, int]:
+    """
+    Проверка и списание дневной квоты в памяти.
+    Возвращает (разрешено, осталось пользователю, осталось всего).
+    """
+    global _total
+
+    _rollover()
+
+    count = _user_counts.get(user_id, 0)
+
+    if _total >= DAILY_TOTAL_LIMIT or count >= DAILY_USER_LIMIT:
+        return False, max(DAILY_USER_LIMIT - count, 0), max(DAILY_TOTAL_LIMIT - _total, 0)
+
+    _user_counts[user_id] = count + 1
+    _total += 1
+    _pending[_day][user_id] += 1
+
+    return True, DAILY_USER_LIMIT - count - 1, DAILY_TOTAL_LIMIT - _total
+
+
+def get_used(user_id: int) -> int:
+    _rollover()
+    return _user_counts.get(user_id, 0)
+
+
+async def reset_user_quota(user_id: int):
+    # сначала дописываем накопленное, чтобы следующий flush не вернул сброшенный счётчик
+    await flush_quota()
+
+    _rollover()
+    _user_counts.pop(user_id, None)
+    await reset_user_limit(user_id, _day)
+
+
+async def flush_quota():
+    """
+    Запись накопленных приращений в БД (по дню — одна транзакция).
+    При ошибке приращения возвращаются в очередь.
+    """
+    async with _flush_lock:
+        for day in list(_pending):
+            users = _pending.pop(day)
+            if not users:
+                continue
+
+            try:
+                await add_limits(day, dict(users), sum(users.values()))
+            except Exception:
+                _pending[day].update(users)
+                raise
+
+
+async def quota_flush_worker():
+    while True:
+        await asyncio.sleep(QUOTA_FLUSH_INTERVAL)
+
+        try:
+            await flush_quota()
+        except Exception:
+            logger.exception("quota flush failed")
@@ -0,0 +1,130 @@
+import time
+from collections import OrderedDict
+from dataclasses import replace
+
+from bot.keyboards.reading import build_reading_keyboard
+from constants import READING_CACHE_SIZE, READING_SESSION_TTL
+from models import Config, ReadingSession, get_config
+from parse import get_article, get_caption, get_ctx_req_by_config
+
+# (lang, title, rules_url) -> ReadingSession, LRU на READING_CACHE_SIZE статей
+_sessions: OrderedDict[tuple[str, str, str], ReadingSession] = OrderedDict()
+
+
+def _session_key(cfg: Config) -> tuple[str, str, str]:
+    # всё, от чего зависят подписи и клавиатуры: язык (может прийти из URL в title) и ссылка на правила
+    return cfg.LANG_CODE, cfg.WIKI_URL_OR_NAME, cfg.RULES_URL
+
+
+async def build_reading_session(cfg: Config) -> ReadingSession | None:
+    """
+    Разбивка статьи на страницы (один раз на статью): статья берётся из articles_cache
+    либо загружается, как при обычном запросе.
+    """
+    lang, title = cfg.LANG_CODE, cfg.WIKI_URL_OR_NAME
+    ctx_req = await get_ctx_req_by_config(cfg, True)
+
+    article, ctx = await get_article(cfg, ctx_req=ctx_req)
+    if not article or not article.paragraphs:
+        return None
+
+    total_pages = len(article.paragraphs)
+    captions, keyboards = [], []
+
+    for page, paragraph in enumerate(article.paragraphs):
+        page_article = replace(article, image=None, paragraphs=[paragraph], captions={})
+
+        captions.append(get_caption(
+            page_article,
+            cfg.RULES_URL,
+            ctx,
+            use_only_first_paragraph=True,
+            without_article_link=True,
+            with_attribution=page == 0,
+        ))
+        keyboards.append(build_reading_keyboard(
+            lang=lang,
+            title=article.title,
+            current_page=page,
+            total_pages=total_pages,
+        ))
+
+    return ReadingSession(
+        lang=lang,
+        title=title,
+        link=article.link,
+        captions=captions,
+        keyboards=keyboards,
+    )
+
+
+async def get_reading_session(chat_id: int, lang: str, title: str) -> ReadingSession | None:
+    cfg = await get_config(chat_id, title, lang)
+    key = _session_key(cfg)
+
+    session = _sessions.get(key)
+    if session and time.monotonic() - session.created_at < READING_SESSION_TTL:
+        _sessions.move_to_end(key)
+        return session
+
+    session = await build_reading_session(cfg)
+    if not session:
+        _sessions.pop(key, None)
+        return None
+
+    _sessions[key] = session
+    _sessions.move_to_end(key)
+
+    while len(_sessions) > READING_CACHE_SIZE:
+        _sessions.popitem(last=False)
+
+    return session
+
+
+def invalidate_reading_session(link: str):
+    # по ссылке статьи: язык ключа мог прийти из URL в запросе (get_config), а не от обработчика
+    for key in [key for key, session in _sessions.items() if session.link == link]:
+        del _sessions[key]
+
+
+async def render_reading_page(context, chat_id: int, lang: str, title: str, page: int, edit_message=None) -> bool:
+    """
+    Отправка (или смена) страницы режима чтения. False — статью получить не удалось.
+    """
+    session = await get_reading_session(chat_id, lang, title)
+
+    if not session:
+        if edit_message:
+            await edit_message.edit_text("Error")
+        else:
+            await context.bot.send_message(chat_id, "Error")
+        return False
+
+    if not 0 <= page < session.total_pages:
+        return True
+
+    caption, keyboard = session.captions[page], session.keyboards[page]
+
+    if not edit_message:
+        await context.bot.send_message(
+            chat_id,
+            caption,
+            parse_mode="HTML",
+            reply_markup=keyboard,
+            disable_web_page_preview=True,
+        )
+    elif edit_message.photo or edit_message.animation or edit_message.video:
+        await edit_message.edit_caption(
+            caption=caption,
+            parse_mode="HTML",
+            reply_markup=keyboard,
+        )
+    else:
+        await edit_message.edit_text(
+            text=caption,
+            parse_mode="HTML",
+            reply_markup=keyboard,
+            disable_web_page_preview=True,
+        )
+
+    return True
@@ -1,14 +1,14 @@
 from telegram import InputMediaPhoto, InputMediaAnimation, InlineKeyboardMarkup
 
 from bot.keyboards.disambig import build_disambig_keyboard
-from bot.keyboards.reading import build_article_keyboard_with_reading_button, build_reading_keyboard
+from bot.keyboards.reading import build_article_keyboard_with_reading_button
 from bot.services.disambig import get_session, get_disambig_keyboard_from_session
+from bot.services.reading import invalidate_reading_session
 from constants import SELF_MADE_IMAGE_CASE, NAZI_IMAGE_CASE
-from db import update_image_desc
+from db import update_image_desc, set_cached_image_file_id
 from i18n import TKey
 from models import DisambigLevel, get_config
-from parse import get_caption, get_article
-from utils import get_img_buf_by_text
+from parse import get_stored_caption, get_article, get_title_image_media, is_title_image, save_title_image_file_id
 
 
 async def render_article(
@@ -21,7 +21,6 @@ async def render_article(
         ctx_req=None,
         edit_message=None,
         page=0,
-        reading=False,
         disable_web_page_preview=True,
         add_reading_button=True,
 ):
@@ -39,10 +38,9 @@ async def render_article(
             await context.bot.send_message(chat_id, "Error")
         return
 
-    total_pages = len(article.paragraphs)
-    if reading:
-        article.image = None
-        article.paragraphs = [article.paragraphs[page]]
+    # статья загружена заново (например, /update) — страницы режима чтения пересобираются
+    if not (ctx_req and ctx_req.cached):
+        invalidate_reading_session(article.link)
 
     # =========================
     # MEDIA
@@ -51,9 +49,9 @@ async def render_article(
 
     if article.image:
         if article.image.desc == SELF_MADE_IMAGE_CASE:
-            media = get_img_buf_by_text(article.title)
+            media = await get_title_image_media(article.title)
         elif article.image.desc == NAZI_IMAGE_CASE:
-            media = get_img_buf_by_text(article.title)
+            media = await get_title_image_media(article.title)
             article.paragraphs = [ctx.t(TKey.NAZI_REJECT_TEXT)] + article.paragraphs
         else:
             media = article.image.desc
@@ -62,12 +60,11 @@ async def render_article(
     # =========================
     # CAPTION
     # =========================
-    caption = get_caption(
+    caption = await get_stored_caption(
         article,
         cfg.RULES_URL,
         ctx,
         use_only_first_paragraph=True,
-        without_article_link=reading,
         with_attribution=page == 0,
     )
 
@@ -97,13 +94,6 @@ async def render_article(
                 article.disambig_titles,
                 0
             )
-    elif reading:
-        keyboard = build_reading_keyboard(
-            lang=lang,
-            title=article.title,
-            current_page=page,
-            total_pages=total_pages,
-        )
     else:
         # Для обычных статей добавляем кнопку "Читать статью здесь"
         reading_button_keyboard = (
@@ -221,12 +211,20 @@ async def render_article(
     # =========================
     # CACHE UPDATE
     # =========================
-    if media and article.image and article.image.desc != file_id:
+    if media and is_title_image(article.image):
+        # маркер в desc сохраняется, file_id картинки с заголовком — в title_images
+        if isinstance(file_id, str) and media != file_id:
+            await save_title_image_file_id(article.title, file_id)
+        if article.is_disambig and edit_message and isinstance(file_id, str):
+            session = get_session(context, msg.message_id)
+            session.current().media = file_id
+    elif media and article.image and article.image.desc != file_id:
         article.image.desc = file_id
         if article.is_disambig and edit_message:
             session = get_session(context, msg.message_id)
             session.current().media = file_id
         await update_image_desc(article.link, file_id)
+        await set_cached_image_file_id(article.image.page_url, file_id)
 
     # =========================
     # DISAMBIG STATE
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from urllib.parse import urlparse
+
+from constants import (
+    REVALIDATE_MAX_AGE_HOURS,
+    REVALIDATE_INTERVAL,
+    REVALIDATE_BATCH,
+    REVALIDATE_CONCURRENCY,
+    REVALIDATE_BUDGET_PER_HOUR,
+)
+from db import flush_article_hits, get_articles_to_revalidate, evict_negative_results
+from fetch import get_queue_depths
+from parse import revalidate_cached_article
+
+logger = logging.getLogger(__name__)
+
+# updated — статья изменилась и перезаписана, unchanged — нет, failed — ошибка запроса или разбора
+revalidate_stats: Counter[str] = Counter()
+
+# время перепроверок за последний час (бюджет запросов к Wikimedia)
+_spent: deque[float] = deque()
+
+
+def _budget_left() -> int:
+    now = time.monotonic()
+
+    while _spent and now - _spent[0] > 3600:
+        _spent.popleft()
+
+    return REVALIDATE_BUDGET_PER_HOUR - len(_spent)
+
+
+async def _revalidate(link: str, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        # пользовательские запросы важнее — статья останется в выборке следующего прохода
+        if get_queue_depths().get(urlparse(link).netloc):
+            return
+
+        _spent.append(time.monotonic())
+
+        try:
+            updated = await revalidate_cached_article(link)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            revalidate_stats["failed"] += 1
+            logger.exception("revalidate failed: %s", link)
+            return
+
+        revalidate_stats["updated" if updated else "unchanged"] += 1
+
+
+async def revalidate_worker():
+    """
+    Фоновое обновление articles_cache: давно не сверявшиеся статьи, самые запрашиваемые — первыми.
+    Не больше REVALIDATE_BUDGET_PER_HOUR перепроверок в час и REVALIDATE_CONCURRENCY одновременно.
+    Заодно каждый проход вычищает истёкшие записи negative_cache.
+    """
+    semaphore = asyncio.Semaphore(REVALIDATE_CONCURRENCY)
+
+    while True:
+        await asyncio.sleep(REVALIDATE_INTERVAL)
+
+        try:
+            await flush_article_hits()
+            await evict_negative_results()
+
+            budget = _budget_left()
+            if budget <= 0:
+                continue
+
+            links = await get_articles_to_revalidate(REVALIDATE_MAX_AGE_HOURS, min(REVALIDATE_BATCH, budget))
+            await asyncio.gather(*(_revalidate(link, semaphore) for link in links))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("revalidate round failed")
@@ -16,15 +16,95 @@ FONT_PATH = os.path.join(DIR_PATH, "Renju.otf")
 NAZI_IMAGE_CASE = \
     "I condemn nazi ideology. If this appears in an exception, generate the image manually for this case."
 SELF_MADE_IMAGE_CASE = "If this appears in an exception, generate the image manually for this case."
+# Параметры отрисовки картинок с заголовком (часть ключа title_images): при изменении
+# шрифта или draw_centered_text поменяйте строку, чтобы картинки перерисовались
+TITLE_IMAGE_PARAMS = "Renju.otf|1500|10|80|120-20|10"
 
 CHANNEL_USERNAME = "@wikifeat"
 User_Agent = 'wikifeat/0.55 (https://github.com/petsernik/wikifeat)'
 
+# ==== HTTP ====
+HTTP_TIMEOUT = 60.0
+HTTP_POOL_LIMIT = 100
+HTTP_POOL_LIMIT_PER_HOST = 10
+HTTP_KEEPALIVE_TIMEOUT = 60.0
+HTTP_DNS_CACHE_TTL = 300
+HTTP_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# ==== RATE LIMITS (token bucket на каждый хост) ====
+HTTP_RATE_PER_HOST = 5.0
+HTTP_BURST_PER_HOST = 10
+HTTP_MAX_RETRIES = 3
+HTTP_RETRY_AFTER_DEFAULT = 5.0
+HTTP_RETRY_AFTER_MAX = 120.0
+HTTP_QUEUE_WARN_DEPTH = 20
+
 PAGE_SIZE = 8
 
+# ==== READING MODE ====
+READING_CACHE_SIZE = 500
+READING_SESSION_TTL = 30 * 60  # seconds
+
+# ==== IMAGES ====
+# 'api' — метаданные через MediaWiki imageinfo/extmetadata (со скрапингом страницы File: как запасным вариантом),
+# 'scrape' — только скрапинг страницы File:
+IMAGE_METADATA_ENGINE = 'api'
+IMAGEINFO_BATCH_SIZE = 50
+# seconds: столько ждут одновременные запросы метаданных, чтобы уйти к API одним запросом
+IMAGEINFO_BATCH_WAIT = 0.05
+# сколько дней разобранная страница File: берётся из image_cache без повторного запроса
+IMAGE_CACHE_TTL_DAYS = 30
+
+# ==== PARSING ====
+# Бэкенд BeautifulSoup: 'html.parser' (чистый Python) или 'lxml' (C, требует пакет lxml).
+# Перед переключением на 'lxml' прогоните `python -m tests.parse_test` — результаты LANG_PARSERS должны совпасть.
+HTML_PARSER = 'html.parser'
+# 'thread' или 'process': где выполняется разбор HTML (вне event loop)
+PARSE_EXECUTOR = 'thread'
+PARSE_WORKERS = 4
+
 # ==== LIMITS ====
 DAILY_TOTAL_LIMIT = 4900
 DAILY_USER_LIMIT = 100
+QUOTA_IN_MEMORY = True  # счётчики в памяти бота (False — каждый запрос через consume_quota в БД)
+QUOTA_FLUSH_INTERVAL = 10.0  # seconds между записью накопленных счётчиков в БД
+
+# ==== RANDOM FEATURED ====
+FEATURED_CACHE_TTL = 10 * 60  # seconds, список заголовков в памяти перечитывается из БД
+RANDOM_NO_REPEAT = 20  # сколько последних случайных статей пользователя не повторять
+RANDOM_RECENT_USERS = 10_000  # пользователей, для которых помнятся последние случайные статьи
+
+# ==== PREWARM (очередь готовых случайных статей) ====
+PREWARM_QUEUE_SIZE = 3  # готовых статей на язык
+PREWARM_INTERVAL = 2.0  # seconds после дозагрузки очереди языка, чтобы не съедать лимит запросов к Wikimedia
+PREWARM_IDLE = 30.0  # seconds, пауза, когда все очереди полны
+
+# ==== ARTICLE LRU (articles_cache в памяти) ====
+ARTICLE_LRU_SIZE = 1000  # статей
+ARTICLE_LRU_STALE_MINUTES = 10  # старше — отдаётся сразу, но перечитывается из БД в фоне
+
+# ==== REVALIDATE (фоновое обновление articles_cache) ====
+REVALIDATE_MAX_AGE_HOURS = 24  # статья, не сверявшаяся с Википедией дольше, перепроверяется
+REVALIDATE_INTERVAL = 60.0  # seconds между проходами
+REVALIDATE_BATCH = 20  # статей за проход
+REVALIDATE_CONCURRENCY = 2  # одновременных перепроверок
+REVALIDATE_BUDGET_PER_HOUR = 300  # перепроверок в час (каждая — от одного запроса к Wikimedia)
+
+# ==== WARM (warm.py — прогрев articles_cache избранными статьями) ====
+WARM_CONCURRENCY = 4  # статей одновременно (запросы к хосту всё равно ограничены HTTP_RATE_PER_HOST)
+WARM_PROGRESS_PATH = os.path.join(DIR_PATH, 'tmp', 'warm_progress.jsonl')
+WARM_REPORT_EVERY = 50  # статей между строками прогресса
+
+# ==== NEGATIVE CACHE (неудачные запросы статей) ====
+NEGATIVE_NOT_FOUND = 'not_found'  # 404
+NEGATIVE_NOT_ARTICLE = 'not_article'  # итоговая страница не проходит filter.is_article
+NEGATIVE_PARSE_FAILED = 'parse_failed'  # парсер не нашёл статью на странице
+NEGATIVE_CACHE_TTL_MINUTES = {
+    NEGATIVE_NOT_FOUND: 6 * 60,
+    NEGATIVE_NOT_ARTICLE: 24 * 60,
+    NEGATIVE_PARSE_FAILED: 60,
+}
+NEGATIVE_CACHE_SIZE = 5000  # записей в памяти
 
 # ==== SPAM ====
 SPAM_INTERVAL = 0.1
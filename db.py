@@ -1,6 +1,11 @@
+import asyncio
 import json
 import logging
-from datetime import datetime
+import random
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import replace
+from datetime import date, datetime
 from typing import Optional, Tuple
 
 import asyncpg
@@ -11,9 +16,18 @@ from constants import (
     DB_HOST,
     DB_MIN_SIZE,
     DB_MAX_SIZE,
-    INIT_SQL_PATH
+    INIT_SQL_PATH,
+    IMAGE_CACHE_TTL_DAYS,
+    SELF_MADE_IMAGE_CASE,
+    NAZI_IMAGE_CASE,
+    FEATURED_CACHE_TTL,
+    RANDOM_NO_REPEAT,
+    RANDOM_RECENT_USERS,
+    ARTICLE_LRU_SIZE,
+    ARTICLE_LRU_STALE_MINUTES,
+    NEGATIVE_CACHE_SIZE,
 )
-from models import Article
+from models import Article, Image
 from utils import get_quote_url_by_str
 
 pool: asyncpg.Pool | None = None
@@ -92,23 +106,80 @@ async def close_db():
         logging.info("Database pool closed")
 
 
-async def get_random_featured_title(lang: str) -> Optional[str]:
+# =========================
+# FEATURED TITLES (в памяти)
+# =========================
+# lang -> (время загрузки, заголовки, те же заголовки множеством)
+_featured_cache: dict[str, tuple[float, list[str], set[str]]] = {}
+_featured_locks: dict[str, asyncio.Lock] = {}
+
+# user_id -> последние RANDOM_NO_REPEAT случайных заголовков, LRU на RANDOM_RECENT_USERS пользователей
+_recent_random: OrderedDict[int, deque[str]] = OrderedDict()
+
+
+async def _get_featured_titles(lang: str) -> list[str]:
+    entry = _featured_cache.get(lang)
+    if entry and time.monotonic() - entry[0] < FEATURED_CACHE_TTL:
+        return entry[1]
+
+    async with _featured_locks.setdefault(lang, asyncio.Lock()):
+        entry = _featured_cache.get(lang)
+        if entry and time.monotonic() - entry[0] < FEATURED_CACHE_TTL:
+            return entry[1]
+
+        rows = await pool.fetch("SELECT title FROM featured_articles WHERE lang = $1", lang)
+        titles = [row["title"] for row in rows]
+
+        _featured_cache[lang] = (time.monotonic(), titles, set(titles))
+        return titles
+
+
+def invalidate_featured_titles(lang: str):
+    _featured_cache.pop(lang, None)
+
+
+def get_recent_random(user_id: int) -> deque[str]:
+    recent = _recent_random.get(user_id)
+
+    if recent is None:
+        recent = _recent_random[user_id] = deque(maxlen=RANDOM_NO_REPEAT)
+        while len(_recent_random) > RANDOM_RECENT_USERS:
+            _recent_random.popitem(last=False)
+    else:
+        _recent_random.move_to_end(user_id)
+
+    return recent
+
+
+async def get_random_featured_title(lang: str, user_id: int | None = None) -> Optional[str]:
+    """
+    Равновероятный выбор за O(1) из списка заголовков в памяти (без ORDER BY RANDOM()).
+    Для user_id не повторяются последние RANDOM_NO_REPEAT статей, если есть из чего выбирать.
+    """
     if not pool:
         return None
 
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow(
-            """
-            SELECT title
-            FROM featured_articles
-            WHERE lang = $1
-            ORDER BY RANDOM()
-            LIMIT 1
-            """,
-            lang
-        )
+    titles = await _get_featured_titles(lang)
+    if not titles:
+        return None
+
+    if user_id is None:
+        return random.choice(titles)
 
-    return row["title"] if row else None
+    recent = get_recent_random(user_id)
+    title = random.choice(titles)
+
+    # недавние занимают малую долю списка → хватает пары попыток
+    if title in recent and len(titles) > len(recent):
+        for _ in range(8):
+            title = random.choice(titles)
+            if title not in recent:
+                break
+        else:
+            title = random.choice([t for t in titles if t not in recent])
+
+    recent.append(title)
+    return title
 
 
 async def clear_all_featured_articles_in_db(lang: str):
@@ -119,6 +190,8 @@ async def clear_all_featured_articles_in_db(lang: str):
                 lang
             )
 
+    invalidate_featured_titles(lang)
+
 
 async def update_featured_articles_in_db(lang: str, titles: set[str]):
     async with pool.acquire() as conn:
@@ -132,6 +205,19 @@ async def update_featured_articles_in_db(lang: str, titles: set[str]):
                 [(lang, t) for t in titles]
             )
 
+    # новые заголовки дописываем в список в памяти, не перечитывая его целиком
+    entry = _featured_cache.get(lang)
+    if entry:
+        _, cached_titles, cached_set = entry
+        for title in titles - cached_set:
+            cached_titles.append(title)
+            cached_set.add(title)
+
+
+async def get_featured_titles(lang: str) -> list[str]:
+    rows = await pool.fetch("SELECT title FROM featured_articles WHERE lang = $1 ORDER BY title", lang)
+    return [row["title"] for row in rows]
+
 
 async def has_featured_articles(lang: str) -> bool:
     query = """
@@ -200,72 +286,248 @@ async def set_lang(user_id: int, lang: str):
 # LIMITS
 # =========================
 
-async def increment_user_limit(user_id: int):
+# День (UTC, utils.get_today) передаёт вызывающий код: CURRENT_DATE зависит от часового пояса БД
+
+async def increment_user_limit(user_id: int, day: date):
     async with pool.acquire() as conn:
         # пользовательский лимит
         await conn.execute(
             """
             INSERT INTO user_limits(user_id, date, count)
-            VALUES($1, CURRENT_DATE, 1)
+            VALUES($1, $2, 1)
             ON CONFLICT (user_id, date)
             DO UPDATE SET count = user_limits.count + 1
             """,
-            user_id
+            user_id, day
         )
 
         # глобальный лимит
         await conn.execute(
             """
             INSERT INTO global_limits(date, total)
-            VALUES(CURRENT_DATE, 1)
+            VALUES($1, 1)
             ON CONFLICT (date)
             DO UPDATE SET total = global_limits.total + 1
-            """
+            """,
+            day
         )
 
 
-async def get_user_limit(user_id: int) -> int:
+async def get_user_limit(user_id: int, day: date) -> int:
     async with pool.acquire() as conn:
         row = await conn.fetchrow(
             """
             SELECT count FROM user_limits
-            WHERE user_id=$1 AND date=CURRENT_DATE
+            WHERE user_id=$1 AND date=$2
             """,
-            user_id
+            user_id, day
         )
         return row["count"] if row else 0
 
 
-async def get_global_limit() -> int:
+async def get_global_limit(day: date) -> int:
     async with pool.acquire() as conn:
         row = await conn.fetchrow(
             """
             SELECT total FROM global_limits
-            WHERE date=CURRENT_DATE
-            """
+            WHERE date=$1
+            """,
+            day
         )
         return row["total"] if row else 0
 
 
-async def reset_user_limit(user_id: int):
+async def get_limits(day: date) -> Tuple[int, dict[int, int]]:
+    """
+    Счётчики за день: (всего, {user_id: count}).
+    """
+    async with pool.acquire() as conn:
+        total = await conn.fetchval("SELECT total FROM global_limits WHERE date=$1", day)
+        rows = await conn.fetch("SELECT user_id, count FROM user_limits WHERE date=$1", day)
+
+    return total or 0, {row["user_id"]: row["count"] for row in rows}
+
+
+async def add_limits(day: date, user_deltas: dict[int, int], total_delta: int):
+    """
+    Прибавляет накопленные приращения счётчиков за день одной транзакцией.
+    """
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            if total_delta:
+                await conn.execute(
+                    """
+                    INSERT INTO global_limits(date, total)
+                    VALUES($1, $2)
+                    ON CONFLICT (date)
+                    DO UPDATE SET total = global_limits.total + EXCLUDED.total
+                    """,
+                    day, total_delta
+                )
+
+            await conn.executemany(
+                """
+                INSERT INTO user_limits(user_id, date, count)
+                VALUES($1, $2, $3)
+                ON CONFLICT (user_id, date)
+                DO UPDATE SET count = user_limits.count + EXCLUDED.count
+                """,
+                [(user_id, day, delta) for user_id, delta in user_deltas.items()]
+            )
+
+
+async def reset_user_limit(user_id: int, day: date):
     async with pool.acquire() as conn:
         await conn.execute(
             """
             DELETE FROM user_limits
-            WHERE user_id=$1 AND date=CURRENT_DATE
+            WHERE user_id=$1 AND date=$2
             """,
-            user_id
+            user_id, day
         )
 
 
+# =========================
+# ARTICLE LRU (articles_cache в памяти)
+# =========================
+# hit — свежая запись, stale — отдана устаревшая и перечитывается в фоне, miss — чтение из БД
+article_cache_stats: Counter[str] = Counter()
+
+# link -> (статья вместе с изображением, время загрузки)
+_article_lru: OrderedDict[str, tuple[Article, float]] = OrderedDict()
+# url_start -> link (то же, что quote_url_cache)
+_final_links: OrderedDict[str, str] = OrderedDict()
+
+_article_refreshing: dict[str, asyncio.Task] = {}
+_article_epoch = 0  # растёт при каждой инвалидации, чтобы фоновое чтение не вернуло старую строку
+
+
+def _copy_article(article: Article, with_image: bool) -> Article:
+    # вызывающие меняют image.desc и captions, поэтому наружу — только копии
+    image = replace(article.image) if with_image and article.image else None
+    return replace(article, image=image, captions=dict(article.captions))
+
+
+def _remember_article(row, url_start: str | None = None) -> Article:
+    article = Article.from_db(row, True)
+
+    _article_lru[article.link] = (article, time.monotonic())
+    _article_lru.move_to_end(article.link)
+    while len(_article_lru) > ARTICLE_LRU_SIZE:
+        _article_lru.popitem(last=False)
+
+    if url_start:
+        _final_links[url_start] = article.link
+        _final_links.move_to_end(url_start)
+        while len(_final_links) > ARTICLE_LRU_SIZE:
+            _final_links.popitem(last=False)
+
+    return article
+
+
+def invalidate_article(link: str):
+    global _article_epoch
+
+    _article_epoch += 1
+    _article_lru.pop(link, None)
+
+    for url_start in [u for u, final in _final_links.items() if final == link]:
+        del _final_links[url_start]
+
+
+async def _refresh_article(link: str):
+    epoch = _article_epoch
+
+    try:
+        row = await pool.fetchrow("SELECT * FROM articles_cache WHERE link = $1", link)
+
+        if epoch != _article_epoch:
+            return
+
+        if row:
+            _remember_article(row)
+        else:
+            invalidate_article(link)
+    except Exception:
+        logging.exception("article refresh failed: %s", link)
+    finally:
+        _article_refreshing.pop(link, None)
+
+
+def _get_remembered_article(link: str) -> Optional[Article]:
+    """
+    Статья из памяти. Устаревшая (старше ARTICLE_LRU_STALE_MINUTES) отдаётся сразу
+    и перечитывается из БД в фоне.
+    """
+    entry = _article_lru.get(link)
+    if not entry:
+        return None
+
+    article, loaded_at = entry
+    _article_lru.move_to_end(link)
+
+    if time.monotonic() - loaded_at < ARTICLE_LRU_STALE_MINUTES * 60:
+        article_cache_stats["hit"] += 1
+    else:
+        article_cache_stats["stale"] += 1
+        if link not in _article_refreshing:
+            _article_refreshing[link] = asyncio.create_task(_refresh_article(link))
+
+    return article
+
+
+def get_article_cache_info() -> dict[str, int]:
+    return {"size": len(_article_lru), "max_size": ARTICLE_LRU_SIZE, **article_cache_stats}
+
+
 # =========================
 # ARTICLE CACHE
 # =========================
+# link -> сколько раз статью отдали из кеша с последней записи в articles_cache.hits
+_article_hits: Counter[str] = Counter()
+
+
+def record_article_hit(link: str):
+    _article_hits[link] += 1
+
+
+async def flush_article_hits():
+    if not _article_hits:
+        return
+
+    hits = list(_article_hits.items())
+    _article_hits.clear()
+
+    try:
+        await pool.executemany("UPDATE articles_cache SET hits = hits + $2 WHERE link = $1", hits)
+    except Exception:
+        _article_hits.update(dict(hits))
+        raise
+
+
+async def get_articles_to_revalidate(max_age_hours: int, limit: int) -> list[str]:
+    """
+    Давно не сверявшиеся с Википедией статьи, самые запрашиваемые — первыми.
+    """
+    rows = await pool.fetch("""
+        SELECT link FROM articles_cache
+        WHERE checked_at < NOW() - ($1 * INTERVAL '1 hour')
+        ORDER BY hits DESC, checked_at
+        LIMIT $2
+    """, max_age_hours, limit)
+
+    return [row["link"] for row in rows]
+
+
+async def mark_article_checked(link: str):
+    await pool.execute("UPDATE articles_cache SET checked_at = NOW() WHERE link = $1", link)
+
+
 async def save_article_to_db(article: Article) -> None:
     data = article.to_db()
 
     async with pool.acquire() as conn:
-        await conn.execute(
+        article.updated_at = await conn.fetchval(
             """
             INSERT INTO articles_cache (
                 title,
@@ -283,7 +545,10 @@ async def save_article_to_db(article: Article) -> None:
                 image = EXCLUDED.image,
                 is_disambig = EXCLUDED.is_disambig,
                 disambig_titles = EXCLUDED.disambig_titles,
-                updated_at = NOW()
+                captions = '{}'::jsonb,
+                updated_at = NOW(),
+                checked_at = NOW()
+            RETURNING updated_at
             """,
             data["title"],
             data["paragraphs"],
@@ -293,6 +558,8 @@ async def save_article_to_db(article: Article) -> None:
             data["disambig_titles"],
         )
 
+    invalidate_article(article.link)
+
 
 async def update_image_desc(article_link: str, file_id: str):
     query = """
@@ -301,19 +568,96 @@ async def update_image_desc(article_link: str, file_id: str):
         WHERE link = $1
     """
     await pool.execute(query, article_link, file_id)
+    invalidate_article(article_link)
+
+
+async def save_article_caption(article_link: str, updated_at: datetime, key: str, caption: str):
+    """
+    Подпись сохраняется, только если строка не обновлялась с момента чтения статьи.
+    """
+    query = """
+        UPDATE articles_cache
+        SET captions = jsonb_set(captions, ARRAY[$3::text], to_jsonb($4::text))
+        WHERE link = $1 AND updated_at = $2
+    """
+    await pool.execute(query, article_link, updated_at, key, caption)
+
+    entry = _article_lru.get(article_link)
+    if entry and entry[0].updated_at == updated_at:
+        entry[0].captions[key] = caption
 
 
 async def get_article_from_db(link: str, with_image: bool) -> Optional[Article]:
-    async with pool.acquire() as conn:
-        row = await conn.fetchrow("""
-            SELECT * FROM articles_cache
-            WHERE link = $1
-        """, link)
+    article = _get_remembered_article(link)
 
-    if not row:
-        return None
+    if not article:
+        article_cache_stats["miss"] += 1
+
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT * FROM articles_cache
+                WHERE link = $1
+            """, link)
+
+        if not row:
+            return None
 
-    return Article.from_db(row, with_image)
+        article = _remember_article(row)
+
+    return _copy_article(article, with_image)
+
+
+async def resolve_cached_article(
+        url_start: str,
+        lang: str,
+        with_image: bool,
+        *,
+        with_last_title: bool = True,
+) -> Tuple[Optional[Article], Optional[str], Optional[str]]:
+    """
+    Статья по исходному URL: из памяти или одним запросом quote_url_cache → articles_cache (+ negative_cache).
+    Второе значение — последняя избранная статья языка ('' если нет, None при with_last_title=False),
+    третье — причина недавней неудачи из negative_cache, если статьи в кеше нет.
+    """
+    link = _final_links.get(url_start)
+    article = _get_remembered_article(link) if link else None
+
+    if article:
+        last_title = await get_last_article(lang) if with_last_title else None
+        return _copy_article(article, with_image), last_title, None
+
+    entry = _negative.get(url_start)
+    if entry and entry[1] > time.time():
+        last_title = await get_last_article(lang) if with_last_title else None
+        return None, last_title, _live_negative(url_start, entry)
+
+    article_cache_stats["miss"] += 1
+
+    row = await pool.fetchrow("""
+        SELECT
+            a.*,
+            COALESCE((SELECT title FROM last_featured_articles WHERE lang = $2), '') AS last_title,
+            n.reason AS negative_reason,
+            EXTRACT(EPOCH FROM n.expires_at) AS negative_expires_at
+        FROM (SELECT $1::text AS url_start) AS s
+        LEFT JOIN quote_url_cache AS q ON q.url_start = s.url_start
+        LEFT JOIN articles_cache AS a ON a.link = q.url_final
+        LEFT JOIN negative_cache AS n ON n.url = s.url_start AND n.expires_at > NOW()
+    """, url_start, lang)
+
+    last_title = row["last_title"] if with_last_title else None
+
+    if row["link"] is None:
+        negative = None
+        if row["negative_reason"] is not None:
+            entry = (row["negative_reason"], float(row["negative_expires_at"]))
+            _remember_negative(url_start, *entry)
+            negative = _live_negative(url_start, entry)
+
+        return None, last_title, negative
+
+    article = _remember_article(row, url_start)
+    return _copy_article(article, with_image), last_title, None
 
 
 async def article_cached(link: str) -> bool:
@@ -342,10 +686,11 @@ async def get_article_with_meta(link: str, with_image: bool) -> Optional[Tuple[A
 
 
 async def is_article_stale(link: str, max_age_minutes: int) -> bool:
+    # возраст — с последней сверки с Википедией (запись или ревалидация), а не с первого сохранения
     async with pool.acquire() as conn:
         result = await conn.fetchval("""
             SELECT
-                created_at < NOW() - ($2 * INTERVAL '1 minute')
+                checked_at < NOW() - ($2 * INTERVAL '1 minute')
             FROM articles_cache
             WHERE link = $1
         """, link, max_age_minutes)
@@ -354,6 +699,55 @@ async def is_article_stale(link: str, max_age_minutes: int) -> bool:
     return result is None or result
 
 
+# =========================
+# NEGATIVE CACHE (неудачные запросы статей)
+# =========================
+# reason -> сколько повторных запросов отдано из negative_cache без обращения к Википедии
+negative_cache_stats: Counter[str] = Counter()
+
+# url -> (reason, время истечения по time.time())
+_negative: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+
+def _remember_negative(url: str, reason: str, expires_at: float):
+    _negative[url] = (reason, expires_at)
+    _negative.move_to_end(url)
+    while len(_negative) > NEGATIVE_CACHE_SIZE:
+        _negative.popitem(last=False)
+
+
+def _live_negative(url: str, entry: tuple[str, float]) -> Optional[str]:
+    reason, expires_at = entry
+    if expires_at <= time.time():
+        _negative.pop(url, None)
+        return None
+
+    negative_cache_stats[reason] += 1
+    return reason
+
+
+async def save_negative_result(url: str, reason: str, ttl_minutes: int):
+    expires_at = time.time() + ttl_minutes * 60
+    _remember_negative(url, reason, expires_at)
+
+    await pool.execute("""
+        INSERT INTO negative_cache (url, reason, expires_at)
+        VALUES ($1, $2, to_timestamp($3))
+        ON CONFLICT (url) DO UPDATE
+        SET reason = EXCLUDED.reason, expires_at = EXCLUDED.expires_at
+    """, url, reason, expires_at)
+
+
+async def delete_negative_result(url: str):
+    _negative.pop(url, None)
+    await pool.execute("DELETE FROM negative_cache WHERE url = $1", url)
+
+
+async def evict_negative_results() -> int:
+    result = await pool.execute("DELETE FROM negative_cache WHERE expires_at < NOW()")
+    return int(result.split()[-1])
+
+
 # =========================
 # REDIRECTS CACHE
 # =========================
@@ -376,6 +770,153 @@ async def set_cached_final_url(url_start: str, url_final: str) -> None:
         """, url_start, url_final)
 
 
+# =========================
+# IMAGE CACHE (страницы File:)
+# =========================
+async def get_cached_image(page_url: str, lang: str) -> Optional[Image]:
+    row = await pool.fetchrow("""
+        SELECT image, file_id
+        FROM image_cache
+        WHERE page_url = $1 AND lang = $2
+          AND updated_at > NOW() - ($3 * INTERVAL '1 day')
+    """, page_url, lang, IMAGE_CACHE_TTL_DAYS)
+
+    if not row:
+        return None
+
+    image_data = row["image"]
+    if isinstance(image_data, str):
+        image_data = json.loads(image_data)
+
+    image = Image.from_dict(image_data)
+
+    # уже загружено в Telegram → отправляем по file_id (маркеры самодельных картинок не трогаем)
+    if row["file_id"] and image.desc not in (SELF_MADE_IMAGE_CASE, NAZI_IMAGE_CASE):
+        image.desc = row["file_id"]
+
+    return image
+
+
+async def save_cached_image(page_url: str, lang: str, image: Image):
+    await pool.execute("""
+        INSERT INTO image_cache (page_url, lang, image, updated_at)
+        VALUES ($1, $2, $3::jsonb, NOW())
+        ON CONFLICT (page_url, lang) DO UPDATE
+        SET image = EXCLUDED.image,
+            file_id = NULL,
+            updated_at = NOW()
+    """, page_url, lang, json.dumps(image.to_dict()))
+
+
+async def set_cached_image_file_id(page_url: str, file_id: str):
+    # file_id один для всех языков: это тот же файл
+    await pool.execute("""
+        UPDATE image_cache
+        SET file_id = $2
+        WHERE page_url = $1
+    """, page_url, file_id)
+
+
+# =========================
+# TITLE IMAGES
+# =========================
+async def get_title_image(text: str, params: str) -> Optional[asyncpg.Record]:
+    return await pool.fetchrow("""
+        SELECT png, file_id
+        FROM title_images
+        WHERE text = $1 AND params = $2
+    """, text, params)
+
+
+async def save_title_image(text: str, params: str, png: bytes):
+    await pool.execute("""
+        INSERT INTO title_images (text, params, png)
+        VALUES ($1, $2, $3)
+        ON CONFLICT (text, params) DO NOTHING
+    """, text, params, png)
+
+
+async def set_title_image_file_id(text: str, params: str, file_id: str):
+    await pool.execute("""
+        UPDATE title_images
+        SET file_id = $3
+        WHERE text = $1 AND params = $2
+    """, text, params, file_id)
+
+
+# =========================
+# HTTP CACHE
+# =========================
+async def get_http_cache_entry(url: str) -> Optional[asyncpg.Record]:
+    return await pool.fetchrow("""
+        SELECT final_url, etag, last_modified, expires_at, body, article_link,
+               expires_at IS NOT NULL AND expires_at > NOW() AS fresh
+        FROM http_cache
+        WHERE url = $1
+    """, url)
+
+
+async def save_http_cache_entry(
+        url: str,
+        final_url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        max_age: Optional[int],
+        body: bytes,
+) -> None:
+    await pool.execute("""
+        INSERT INTO http_cache (url, final_url, etag, last_modified, expires_at, body, size)
+        VALUES ($1, $2, $3, $4, NOW() + ($5 * INTERVAL '1 second'), $6, $7)
+        ON CONFLICT (url) DO UPDATE
+        SET
+            final_url = EXCLUDED.final_url,
+            etag = EXCLUDED.etag,
+            last_modified = EXCLUDED.last_modified,
+            expires_at = EXCLUDED.expires_at,
+            body = EXCLUDED.body,
+            size = EXCLUDED.size,
+            article_link = NULL,
+            accessed_at = NOW(),
+            updated_at = NOW()
+    """, url, final_url, etag, last_modified, max_age, body, len(body))
+
+
+async def touch_http_cache_entry(url: str, max_age: Optional[int] = None) -> None:
+    await pool.execute("""
+        UPDATE http_cache
+        SET accessed_at = NOW(),
+            expires_at = COALESCE(NOW() + ($2 * INTERVAL '1 second'), expires_at)
+        WHERE url = $1
+    """, url, max_age)
+
+
+async def set_http_cache_article_link(url: str, article_link: str) -> None:
+    await pool.execute("""
+        UPDATE http_cache
+        SET article_link = $2
+        WHERE url = $1
+    """, url, article_link)
+
+
+async def evict_http_cache(max_bytes: int) -> int:
+    """
+    Удаляет давно не запрошенные записи, пока суммарный размер тел не уложится в max_bytes.
+    """
+    result = await pool.execute("""
+        DELETE FROM http_cache
+        WHERE url IN (
+            SELECT url
+            FROM (
+                SELECT url, SUM(size) OVER (ORDER BY accessed_at DESC, url) AS total
+                FROM http_cache
+            ) t
+            WHERE total > $1
+        )
+    """, max_bytes)
+
+    return int(result.split()[-1])
+
+
 # =========================
 # MEDIAWIKI CACHE
 # =========================
@@ -428,6 +969,7 @@ async def delete_url(lang: str, url_or_name: str):
             )
 
             title = row["title"] if row else None
+            invalidate_article(url)
 
             # -------------------------
             # 2. quote_url_cache
@@ -465,6 +1007,8 @@ async def delete_url(lang: str, url_or_name: str):
                     title
                 )
 
+                invalidate_featured_titles(lang)
+
 
 async def insert_from_backup(
         table: str,
@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, TypeVar
+
+from constants import PARSE_EXECUTOR, PARSE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# =========================
+# PARSE POOL (ONLY ONE)
+# =========================
+
+_executor: Executor | None = None
+
+
+def get_executor() -> Executor:
+    """
+    Пул для CPU-тяжёлого парсинга HTML (BeautifulSoup), чтобы не блокировать event loop бота.
+    PARSE_EXECUTOR: 'thread' или 'process' (для 'process' функции и аргументы должны быть picklable).
+    """
+    global _executor
+
+    if _executor is None:
+        if PARSE_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="parse")
+
+        logger.info("Parse executor created (%s, workers=%s)", PARSE_EXECUTOR, PARSE_WORKERS)
+
+    return _executor
+
+
+async def run_in_pool(func: Callable[..., T], *args) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), func, *args)
+
+
+def shutdown_executor():
+    global _executor
+
+    if _executor:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+        logger.info("Parse executor shut down")
@@ -0,0 +1,307 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import aiohttp
+
+from constants import (
+    User_Agent,
+    HTTP_TIMEOUT,
+    HTTP_POOL_LIMIT,
+    HTTP_POOL_LIMIT_PER_HOST,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_DNS_CACHE_TTL,
+    HTTP_CACHE_MAX_BYTES,
+    HTTP_RATE_PER_HOST,
+    HTTP_BURST_PER_HOST,
+    HTTP_MAX_RETRIES,
+    HTTP_RETRY_AFTER_DEFAULT,
+    HTTP_RETRY_AFTER_MAX,
+    HTTP_QUEUE_WARN_DEPTH,
+)
+from db import (
+    get_http_cache_entry,
+    save_http_cache_entry,
+    touch_http_cache_entry,
+    evict_http_cache,
+)
+from models import HTTPResponse
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# SHARED SESSION (ONLY ONE)
+# =========================
+
+_session: aiohttp.ClientSession | None = None
+
+
+def _create_session() -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        use_dns_cache=True,
+    )
+
+    return aiohttp.ClientSession(
+        connector=connector,
+        # Добавляем хэдер, чтобы соблюсти Wikimedia Foundation User-Agent Policy
+        headers={"User-Agent": User_Agent},
+        timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+    )
+
+
+async def init_http():
+    """
+    Создание общей для процесса HTTP-сессии (вызывать при старте: post_init бота, runner скрипта).
+    """
+    global _session
+
+    if _session and not _session.closed:
+        return
+
+    _session = _create_session()
+    logger.info("HTTP session created")
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Общая HTTP-сессия: пул соединений (keep-alive, кэш DNS) переиспользуется всеми запросами к Wikimedia.
+    Если init_http() ещё не вызывался, сессия создаётся лениво.
+    """
+    global _session
+
+    if _session is None or _session.closed:
+        _session = _create_session()
+
+    return _session
+
+
+async def close_http():
+    """
+    Корректное закрытие HTTP-сессии (важно при shutdown бота).
+    """
+    global _session
+
+    if _session and not _session.closed:
+        await _session.close()
+        logger.info("HTTP session closed")
+
+    _session = None
+
+
+# =========================
+# RATE LIMIT (PER HOST)
+# =========================
+
+class HostRateLimiter:
+    """
+    Token bucket для одного хоста: в среднем rate запросов в секунду, всплески до burst.
+    Ожидающие запросы встают в очередь (FIFO), Retry-After от сервера приостанавливает всю очередь.
+    """
+
+    def __init__(self, host: str, rate: float, burst: int):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = 0
+
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        self.waiting += 1
+
+        if self.waiting >= HTTP_QUEUE_WARN_DEPTH:
+            logger.warning("rate limit queue for %s: %s requests waiting", self.host, self.waiting)
+
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+
+                    if now < self.paused_until:
+                        await asyncio.sleep(self.paused_until - now)
+                        continue
+
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+
+    def pause(self, delay: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        self.tokens = 0
+        # токены начинают копиться только после паузы
+        self.updated = self.paused_until
+
+
+_limiters: dict[str, HostRateLimiter] = {}
+
+
+def get_rate_limiter(host: str) -> HostRateLimiter:
+    limiter = _limiters.get(host)
+
+    if limiter is None:
+        limiter = _limiters[host] = HostRateLimiter(host, HTTP_RATE_PER_HOST, HTTP_BURST_PER_HOST)
+
+    return limiter
+
+
+def get_queue_depths() -> dict[str, int]:
+    return {host: limiter.waiting for host, limiter in _limiters.items()}
+
+
+def _get_retry_after(value: str | None) -> float:
+    if not value:
+        return HTTP_RETRY_AFTER_DEFAULT
+
+    if value.strip().isdigit():
+        delay = float(value)
+    else:
+        try:
+            delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            delay = HTTP_RETRY_AFTER_DEFAULT
+
+    return min(max(delay, 0.0), HTTP_RETRY_AFTER_MAX)
+
+
+# =========================
+# REQUESTS
+# =========================
+
+async def _fetch(url: str, *, params: dict | None = None, headers: dict | None = None) -> HTTPResponse:
+    """
+    Единая точка для всех исходящих запросов: лимит по хосту + повтор при 429/503 с учётом Retry-After.
+    """
+    limiter = get_rate_limiter(urlparse(url).netloc)
+
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        await limiter.acquire()
+
+        async with get_session().get(url, params=params, headers=headers, allow_redirects=True) as resp:
+            if resp.status in (429, 503) and attempt < HTTP_MAX_RETRIES:
+                delay = _get_retry_after(resp.headers.get("Retry-After"))
+                logger.warning("HTTP %s from %s, retry in %.1f s", resp.status, limiter.host, delay)
+                limiter.pause(delay)
+                continue
+
+            content = await resp.read()
+
+            return HTTPResponse(
+                status_code=resp.status,
+                url=str(resp.url),
+                content=content,
+                headers=resp.headers.copy(),
+            )
+
+
+def _raise_for_status(response: HTTPResponse):
+    if response.status_code >= 400:
+        raise Exception(
+            f'Unexpected response code: {response.status_code} ({response.url})'
+        )
+
+
+async def get_request(url: str) -> HTTPResponse:
+    return await _fetch(url)
+
+
+async def get_text(url: str, params: dict | None = None) -> str:
+    response = await _fetch(url, params=params)
+    _raise_for_status(response)
+    return response.text
+
+
+async def get_json(url: str, params: dict | None = None):
+    response = await _fetch(url, params=params)
+    _raise_for_status(response)
+    return json.loads(response.content)
+
+
+# =========================
+# CONDITIONAL GET (HTTP CACHE)
+# =========================
+
+# hit — запись ещё свежая (запрос не отправлялся), not_modified — сервер ответил 304, miss — тело скачано заново
+http_cache_stats: Counter[str] = Counter()
+
+MAX_AGE_RE = re.compile(r'\bmax-age=(\d+)', re.IGNORECASE)
+
+
+def _get_max_age(headers) -> int | None:
+    cache_control = headers.get("Cache-Control", "")
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return None
+
+    m = MAX_AGE_RE.search(cache_control)
+    if not m or int(m.group(1)) <= 0:
+        return None
+
+    return int(m.group(1))
+
+
+def _from_cache(entry) -> HTTPResponse:
+    return HTTPResponse(
+        status_code=200,
+        url=entry["final_url"],
+        content=bytes(entry["body"]),
+        not_modified=True,
+        article_link=entry["article_link"],
+    )
+
+
+async def get_request_cached(url: str) -> HTTPResponse:
+    """
+    GET с ревалидацией через http_cache: отправляет If-None-Match / If-Modified-Since
+    и при 304 возвращает сохранённое тело с not_modified=True.
+    """
+    entry = await get_http_cache_entry(url)
+
+    if entry and entry["fresh"]:
+        http_cache_stats["hit"] += 1
+        return _from_cache(entry)
+
+    headers = {}
+    if entry:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = await _fetch(url, headers=headers)
+
+    if response.status_code == 304 and entry:
+        http_cache_stats["not_modified"] += 1
+        await touch_http_cache_entry(url, _get_max_age(response.headers))
+        return _from_cache(entry)
+
+    http_cache_stats["miss"] += 1
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    max_age = _get_max_age(response.headers)
+
+    if response.status_code == 200 and (etag or last_modified or max_age):
+        await save_http_cache_entry(url, response.url, etag, last_modified, max_age, response.content)
+        await evict_http_cache(HTTP_CACHE_MAX_BYTES)
+
+    return response
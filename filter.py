@@ -2,10 +2,8 @@ import asyncio
 from typing import Tuple
 from urllib.parse import urlparse
 
-import aiohttp
-
-from constants import User_Agent
 from db import get_skip_prefixes_from_db, save_skip_prefixes_to_db
+from fetch import get_json
 from i18n import ADDITIONAL_TRANSLATIONS, TKey
 from utils import unquote_url
 
@@ -31,12 +29,7 @@ async def fetch_skip_prefixes(lang: str) -> Tuple[str, ...]:
         "format": "json"
     }
 
-    headers = {"User-Agent": User_Agent}
-
-    async with aiohttp.ClientSession(headers=headers) as session:
-        async with session.get(url, params=params) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
+    data = await get_json(url, params=params)
 
     namespaces = data["query"]["namespaces"]
     aliases = data["query"].get("namespacealiases", [])
@@ -133,10 +126,9 @@ async def is_valid_title(lang: str, title: str) -> bool:
 
 
 async def is_article(lang: str, url: str) -> bool:
-    url = unquote_url(url)
-    path = urlparse(url).path
-    if not path.startswith(f'https://{lang}.wikipedia.org/wiki/'):
+    parsed = urlparse(unquote_url(url))
+    if parsed.netloc != f'{lang}.wikipedia.org' or not parsed.path.startswith('/wiki/'):
         return False
 
-    title = path.split("/wiki/")[-1]
+    title = parsed.path.split("/wiki/")[-1]
     return await is_valid_title(lang, title)
@@ -3,7 +3,8 @@ import json
 import re
 import time
 from dataclasses import dataclass, asdict, field
-from typing import List, Optional, Any
+from datetime import datetime
+from typing import List, Optional, Any, Mapping
 
 from bs4 import Tag
 from telegram.error import TimedOut, NetworkError
@@ -91,6 +92,8 @@ class Article:
         paragraphs (List[str]): Список абзацев статьи в порядке следования.
         link (str): URL статьи или каноническая ссылка на источник.
         image (Optional[Image]): Объект изображения или None, если оно отсутствует.
+        captions (dict[str, str]): Готовые подписи из articles_cache.captions (в to_db не входят).
+        updated_at (Optional[datetime]): Версия строки articles_cache, к которой относятся captions.
     """
     title: str
     paragraphs: List[str]
@@ -98,6 +101,8 @@ class Article:
     image: Optional[Image]
     is_disambig: bool
     disambig_titles: list[str]
+    captions: dict[str, str] = field(default_factory=dict, compare=False)
+    updated_at: Optional[datetime] = field(default=None, compare=False)
 
     # ---------- DB serialization ----------
 
@@ -140,6 +145,12 @@ class Article:
         elif isinstance(disambig_titles, str):
             disambig_titles = json.loads(disambig_titles)
 
+        captions = row.get("captions")
+        if captions is None:
+            captions = {}
+        elif isinstance(captions, str):
+            captions = json.loads(captions)
+
         return Article(
             title=row["title"],
             paragraphs=paragraphs,
@@ -147,6 +158,8 @@ class Article:
             image=image,
             is_disambig=is_disambig,
             disambig_titles=disambig_titles,
+            captions=captions,
+            updated_at=row.get("updated_at"),
         )
 
 
@@ -166,6 +179,12 @@ class ArticleContextRequest:
     ctx: ArticleContext
     url: str
     cached: bool
+    # уже загруженная из articles_cache статья (cached=True), чтобы get_article не читал БД ещё раз
+    article: Optional[Article] = None
+    # последняя избранная статья языка; None — не запрашивалась
+    last_title: Optional[str] = None
+    # причина недавней неудачи из negative_cache (статья не загружается заново)
+    negative: Optional[str] = None
 
 
 @dataclass(slots=True)
@@ -182,6 +201,31 @@ class ParseResult:
     main_block: Tag | None
 
 
+@dataclass(slots=True)
+class ParsedArticle:
+    """
+    Результат разбора страницы в пуле воркеров: только picklable-данные, без ссылок на дерево BeautifulSoup.
+    """
+    article: Article | None
+    image_page_url: str | None = None
+
+
+@dataclass(slots=True)
+class HTTPResponse:
+    status_code: int
+    url: str
+    content: bytes
+    # ответ взят из http_cache (304 Not Modified или ещё свежая запись)
+    not_modified: bool = False
+    # ссылка на статью в articles_cache, полученная ранее из этого же тела
+    article_link: str | None = None
+    headers: Mapping[str, str] = field(default_factory=dict)
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+
 @dataclass(slots=True)
 class DisambigLevel:
     """
@@ -353,6 +397,33 @@ class DisambigSession:
         return self.back()
 
 
+@dataclass(slots=True)
+class ReadingSession:
+    """
+    Статья, заранее разбитая на страницы режима чтения: подпись и клавиатура для каждой страницы.
+    """
+    lang: str
+    title: str
+    link: str
+    captions: list[str]
+    keyboards: list[Any]
+    created_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def total_pages(self) -> int:
+        return len(self.captions)
+
+
+class ArticleNotFoundError(Exception):
+    pass
+
+
+class NotAnArticleError(ArticleNotFoundError):
+    """
+    Итоговая страница не проходит filter.is_article (служебная страница, перенаправление на неё и т.п.).
+    """
+
+
 class LimitedHTTPStuckError(Exception):
     def __init__(self, cause: Exception):
         self.cause = cause
@@ -1,39 +1,53 @@
 import asyncio
+import copy
 import io
+import logging
 import re
 import sys
+from dataclasses import replace
+from typing import Awaitable, Callable
 from urllib.parse import urlparse
 
-from bs4 import BeautifulSoup
 from bs4.element import Tag
 from telegram.ext import ContextTypes
 
-from constants import SELF_MADE_IMAGE_CASE, DB_TEST_NAME, DB_NAME, NAZI_IMAGE_CASE
-from db import close_db, init_db, get_last_article, set_last_article, get_cached_final_url, article_cached, \
-    get_article_from_db, set_cached_final_url, save_article_to_db, update_image_desc, update_featured_articles_in_db
+from constants import SELF_MADE_IMAGE_CASE, DB_TEST_NAME, DB_NAME, NAZI_IMAGE_CASE, IMAGE_METADATA_ENGINE, \
+    IMAGEINFO_BATCH_SIZE, IMAGEINFO_BATCH_WAIT, TITLE_IMAGE_PARAMS, NEGATIVE_NOT_FOUND, NEGATIVE_NOT_ARTICLE, NEGATIVE_PARSE_FAILED, \
+    NEGATIVE_CACHE_TTL_MINUTES
+from db import close_db, init_db, get_last_article, set_last_article, resolve_cached_article, \
+    get_article_from_db, set_cached_final_url, save_article_to_db, update_image_desc, update_featured_articles_in_db, \
+    set_http_cache_article_link, save_article_caption, get_title_image, save_title_image, set_title_image_file_id, \
+    get_cached_image, save_cached_image, set_cached_image_file_id, record_article_hit, mark_article_checked, \
+    save_negative_result, delete_negative_result
+from fetch import get_request, get_request_cached, get_json, init_http, close_http
 from filter import is_article
 from i18n import TKey, is_unknown_author
-from models import Article, Image, ArticleContext, ArticleContextRequest, Config, get_app
-from parsers import LANG_PARSERS
+from executor import run_in_pool, shutdown_executor
+from models import Article, Image, ArticleContext, ArticleContextRequest, Config, ParsedArticle, get_app, \
+    ArticleNotFoundError, NotAnArticleError
+from parsers import LANG_PARSERS, ARTICLE_PARSE_ONLY
 from utils import (
-    get_request,
     get_quote_url_by_context,
     get_quote_url_by_tag,
     clean_soup,
     remove_brackets_by_rules,
     visible_length,
     extract_attrs_info,
+    extract_info,
     html_to_text,
     replace_links_with_numbers,
     update_links,
-    is_balanced,
-    ends_with_one_char_abbr,
+    cut_at_sentence,
     unquote_url,
     has_link,
     quote_url,
-    get_img_buf_by_text,
+    get_png_by_text,
+    make_soup,
+    make_fragment,
 )
 
+logger = logging.getLogger(__name__)
+
 # stdout/stderr → UTF-8 для корректной кириллицы
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
@@ -42,77 +56,79 @@ sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 # =========================
 # IMAGE BY TAG
 # =========================
-def get_image_by_tag(netloc: str, main_block: Tag, ctx: ArticleContext) -> Image:
+def get_image_page_url(netloc: str, main_block: Tag) -> str | None:
     img_tag = main_block.select_one('a[href] img')
     if not img_tag:
+        return None
+
+    return get_quote_url_by_tag(netloc, img_tag)
+
+
+async def get_image_by_page_url(image_page_url: str | None, ctx: ArticleContext) -> Image:
+    if not image_page_url:
         return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
 
-    image_page_url = get_quote_url_by_tag(netloc, img_tag)
-    return get_image_by_link(image_page_url, ctx)
+    return await get_image_by_link(image_page_url, ctx)
 
 
 # =========================
 # IMAGE BY LINK
 # =========================
-def get_image_by_link(image_page_url: str, ctx: ArticleContext) -> Image:
+IMAGE_MAX_WIDTH, IMAGE_MAX_HEIGHT = 2000, 2000
+
+
+async def get_image_by_link(image_page_url: str, ctx: ArticleContext) -> Image:
     if (image_page_url.endswith(":Commons-logo.svg")
             and ctx.url_or_title != ctx.t(TKey.WIKIMEDIA_COMMONS_TITLE)):
         return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
 
-    netloc = urlparse(image_page_url).netloc
-    response = get_request(image_page_url)
+    # одно и то же изображение встречается во многих статьях → сначала image_cache
+    image = await get_cached_image(image_page_url, ctx.lang)
+    if image:
+        return image
 
-    if response.status_code in (404, 429):
-        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
-    if response.status_code != 200:
-        raise Exception(
-            f'Unexpected response code when get image page: {response.status_code}\n'
-            f'Response body: {response.content}'
-        )
+    image, resolved = await resolve_image(image_page_url, ctx)
 
-    image_soup = BeautifulSoup(response.text, 'html.parser')
+    # заглушку из-за временной ошибки (404/429) не кешируем, иначе она заменит изображение на месяц
+    if resolved:
+        await save_cached_image(image_page_url, ctx.lang, image)
 
-    # nazi image case
-    nazi_img = image_soup.find('img', alt='Nazi symbol')
-    if nazi_img:
-        return pre_image_by_text(ctx, NAZI_IMAGE_CASE)
+    return image
 
-    image_url = None
-    width_max, height_max = 2000, 2000
 
-    resolutions_span = image_soup.find('span', class_='mw-filepage-other-resolutions')
-    if resolutions_span:
-        links = resolutions_span.find_all('a', href=True)
-        for link in links[::-1]:
-            clean_text = re.sub(r'[\s,.]+', '', link.text)
-            match = re.search(r'(\d+)[×xX](\d+)', clean_text)
-            if match:
-                width = int(match.group(1))
-                height = int(match.group(2))
-                if width <= width_max and height <= height_max:
-                    image_url = get_quote_url_by_tag(netloc, link)
-                    break
-    else:
-        file_link_tag = image_soup.find('a', class_='internal')
-        if file_link_tag and file_link_tag.has_attr('href'):
-            image_url = get_quote_url_by_tag(netloc, file_link_tag)
+async def resolve_image(image_page_url: str, ctx: ArticleContext) -> tuple[Image, bool]:
+    """
+    Второе значение — False, если метаданные получить не удалось и вернулась заглушка.
+    """
+    if IMAGE_METADATA_ENGINE == 'api':
+        try:
+            image = await _get_image_by_api_batched(image_page_url, ctx)
+        except Exception:
+            logger.warning("imageinfo API failed for %s", image_page_url, exc_info=True)
+            image = None
 
-    if not image_url:
-        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
+        if image:
+            return image, True
+
+    return await get_image_by_scraping(image_page_url, ctx)
 
-    raw_licenses = {
-        re.sub(r'\s+', ' ', tag.get_text(strip=True))
-        for tag in image_soup.find_all(class_=re.compile('licensetpl_short'))
-    }
 
+# =========================
+# IMAGE HELPERS (общие для API и скрапинга)
+# =========================
+def normalize_licenses(raw_licenses: set[str], ctx: ArticleContext) -> set[str] | None:
+    """
+    Приводит короткие названия лицензий к виду для подписи.
+    None — изображение нельзя использовать (fair use и т.п.), нужна самодельная картинка.
+    """
     if not raw_licenses:
-        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
+        return None
 
     fair_use_keywords = {ctx.t(TKey.FAIR_USE), "Fair use"}
     if ctx.lang == 'fr':
         fair_use_keywords.add("marque déposée")
     if not raw_licenses.isdisjoint(fair_use_keywords):
-        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
+        return None
 
     replacements = {
         "CC BY-SA 4.0": "CC BY-SA",
@@ -137,43 +153,20 @@ def get_image_by_link(image_page_url: str, ctx: ArticleContext) -> Image:
     else:
         image_licenses = {pdm}
 
-    # archive fix
-    if netloc == 'web.archive.org':
-        lst = image_url.split('https://')
-        lst[1] = lst[1][:-1] + 'if_/'
-        req = get_request('https://'.join(lst))
-        if req.status_code != 200:
-            return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
-        image_url = req.url
+    return image_licenses
 
-    image_author_html = extract_attrs_info(
-        image_soup,
-        find_kwargs={'class': 'licensetpl_attr'},
-        next_tags=None
-    )
 
+def fix_known_authors(image_author_html: str | None) -> str | None:
     if image_author_html and "Diego Delso" in image_author_html:
         image_author_html = image_author_html.replace(
             "Diego Delso",
             "Diego Delso, <a href=\"https://delso.photo\">delso.photo</a>",
         )
 
-    if not image_author_html:
-        image_author_html = extract_attrs_info(
-            image_soup,
-            find_kwargs={'id': 'fileinfotpl_aut'},
-            next_tags=('td', 'th')
-        )
-
-    source_html = extract_attrs_info(
-        image_soup,
-        find_kwargs={'id': 'fileinfotpl_src'},
-        next_tags=('td', 'th')
-    )
+    return image_author_html
 
-    if not source_html:
-        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
 
+def format_image_author(netloc: str, image_author_html: str | None, source_html: str, ctx: ArticleContext) -> str:
     unknown = False
 
     if image_author_html:
@@ -182,7 +175,7 @@ def get_image_by_link(image_page_url: str, ctx: ArticleContext) -> Image:
 
         if not unknown:
             if not has_link(image_author_html):
-                source_soup = BeautifulSoup(source_html, 'html.parser')
+                source_soup = make_fragment(source_html)
                 links = source_soup.find_all('a', href=True)
 
                 if len(links) == 1:
@@ -205,13 +198,309 @@ def get_image_by_link(image_page_url: str, ctx: ArticleContext) -> Image:
 
         image_author_html = f"{ctx.t(TKey.AUTHOR_UNKNOWN)}, {source_html}"
 
-    image_author_html = update_links(netloc, image_author_html)
+    return update_links(netloc, image_author_html)
+
+
+# =========================
+# IMAGE BY API (imageinfo + extmetadata)
+# =========================
+IMAGEINFO_EXTMETADATA = (
+    'LicenseShortName', 'Categories', 'Artist', 'Attribution', 'Credit', 'NonFree', 'Restrictions'
+)
+
+# LicenseShortName — только основная лицензия файла; остальные (GFDL + CC BY-SA и т.п.) видны
+# по категориям, которые ставят шаблоны лицензий: CC-BY-SA-3.0, CC-BY-4.0-de, GFDL, CC-zero
+LICENSE_CATEGORY_RE = re.compile(r'^CC-(BY(?:-SA)?)-(\d\.\d)(?:-([a-z]{2,3}))?$')
+LICENSE_CATEGORIES = {'GFDL': 'GFDL', 'CC-zero': 'CC0'}
+
+
+def _licenses_from_categories(categories: str) -> set[str]:
+    licenses = set()
+
+    for category in categories.split('|'):
+        category = category.strip().replace('_', ' ')
+
+        if category in LICENSE_CATEGORIES:
+            licenses.add(LICENSE_CATEGORIES[category])
+            continue
+
+        match = LICENSE_CATEGORY_RE.match(category)
+        if match:
+            kind, version, port = match.groups()
+            licenses.add(f'CC {kind} {version}' + (f' {port}' if port else ''))
+
+    return licenses
+
+
+def _get_file_title(image_page_url: str) -> str:
+    path = unquote_url(urlparse(image_page_url).path)
+    return path.split('/wiki/', 1)[-1].replace('_', ' ')
+
+
+def _metadata_html(value) -> str:
+    """
+    HTML из extmetadata → тот же формат, что даёт extract_attrs_info при скрапинге (текст + ссылки).
+    """
+    if not value:
+        return ''
+
+    parts = []
+    extract_info(make_fragment(str(value)), parts)
+    return ' '.join(parts).strip()
+
+
+def image_from_imageinfo(page: dict, image_page_url: str, ctx: ArticleContext) -> Image | None:
+    """
+    Собирает Image из страницы ответа prop=imageinfo (formatversion=2).
+    None — данных недостаточно, нужно вернуться к скрапингу страницы файла.
+    """
+    info = (page.get('imageinfo') or [None])[0]
+    if not info:
+        return None
+
+    meta = {key: item.get('value') for key, item in (info.get('extmetadata') or {}).items()}
+    if not meta:
+        return None
+
+    restrictions = {r.strip().lower() for r in str(meta.get('Restrictions') or '').split('|')}
+    if 'nazi' in restrictions:
+        return pre_image_by_text(ctx, NAZI_IMAGE_CASE)
+
+    if str(meta.get('NonFree') or '').lower() == 'true':
+        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
+
+    image_url = info.get('thumburl') or info.get('url')
+    if not image_url:
+        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
+
+    license_name = re.sub(r'\s+', ' ', html_to_text(str(meta.get('LicenseShortName') or ''))).strip()
+
+    # тот же набор, что даёт скрапинг по всем licensetpl_short на странице файла
+    raw_licenses = _licenses_from_categories(str(meta.get('Categories') or ''))
+    if license_name:
+        raw_licenses.add(license_name)
+
+    image_licenses = normalize_licenses(raw_licenses, ctx)
+
+    if not image_licenses:
+        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
+
+    image_author_html = fix_known_authors(_metadata_html(meta.get('Attribution')))
+    if not image_author_html:
+        image_author_html = _metadata_html(meta.get('Artist'))
+
+    source_html = _metadata_html(meta.get('Credit'))
+    if not source_html:
+        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
+
+    netloc = urlparse(image_page_url).netloc
 
     return Image(
         desc=image_url,
         licenses=sorted(image_licenses),
         page_url=image_page_url,
-        author_html=image_author_html,
+        author_html=format_image_author(netloc, image_author_html, source_html, ctx),
+        is_animation=image_url.endswith(".gif")
+    )
+
+
+async def get_images_by_api(image_page_urls: list[str], ctx: ArticleContext) -> dict[str, Image | None]:
+    """
+    Метаданные сразу для многих файлов через MediaWiki API (prop=imageinfo&iiprop=extmetadata|url),
+    по IMAGEINFO_BATCH_SIZE файлов в запросе. Для файлов без ответа значение None.
+    """
+    result: dict[str, Image | None] = {}
+    by_api: dict[str, list[str]] = {}
+
+    for image_page_url in dict.fromkeys(image_page_urls):
+        parsed = urlparse(image_page_url)
+
+        # у web.archive.org нет API → только скрапинг
+        if parsed.netloc == 'web.archive.org':
+            result[image_page_url] = None
+            continue
+
+        by_api.setdefault(f'{parsed.scheme}://{parsed.netloc}/w/api.php', []).append(image_page_url)
+
+    for api_url, urls in by_api.items():
+        for i in range(0, len(urls), IMAGEINFO_BATCH_SIZE):
+            titles = {url: _get_file_title(url) for url in urls[i:i + IMAGEINFO_BATCH_SIZE]}
+
+            data = await get_json(api_url, params={
+                'action': 'query',
+                'format': 'json',
+                'formatversion': '2',
+                'redirects': '1',
+                'prop': 'imageinfo',
+                'iiprop': 'url|mime|extmetadata',
+                'iiurlwidth': str(IMAGE_MAX_WIDTH),
+                'iiurlheight': str(IMAGE_MAX_HEIGHT),
+                'iiextmetadatalanguage': ctx.lang,
+                'iiextmetadatafilter': '|'.join(IMAGEINFO_EXTMETADATA),
+                'titles': '|'.join(dict.fromkeys(titles.values())),
+            })
+
+            query = data.get('query') or {}
+            normalized = {n['from']: n['to'] for n in query.get('normalized', [])}
+            redirects = {r['from']: r['to'] for r in query.get('redirects', [])}
+            pages = {p['title']: p for p in query.get('pages', [])}
+
+            for url, title in titles.items():
+                title = normalized.get(title, title)
+                title = redirects.get(title, title)
+
+                page = pages.get(title)
+                result[url] = image_from_imageinfo(page, url, ctx) if page else None
+
+    return result
+
+
+# lang -> {image_page_url: future}: одновременные запросы метаданных (warm.py, prewarm, пользователи)
+# ждут IMAGEINFO_BATCH_WAIT и уходят к API одним get_images_by_api
+_image_batches: dict[str, dict[str, asyncio.Future]] = {}
+_image_batch_tasks: set[asyncio.Task] = set()
+
+
+async def _flush_image_batch(ctx: ArticleContext, batch: dict[str, asyncio.Future]):
+    await asyncio.sleep(IMAGEINFO_BATCH_WAIT)
+
+    if _image_batches.get(ctx.lang) is batch:
+        del _image_batches[ctx.lang]
+
+    try:
+        images = await get_images_by_api(list(batch), ctx)
+    except Exception as exc:
+        for future in batch.values():
+            if not future.done():
+                future.set_exception(exc)
+        return
+
+    for url, future in batch.items():
+        if not future.done():
+            future.set_result(images.get(url))
+
+
+async def _get_image_by_api_batched(image_page_url: str, ctx: ArticleContext) -> Image | None:
+    # Image зависит от ctx только через язык (переводы подписи), поэтому партия — на язык
+    batch = _image_batches.get(ctx.lang)
+    if batch is None:
+        batch = _image_batches[ctx.lang] = {}
+        task = asyncio.create_task(_flush_image_batch(ctx, batch))
+        _image_batch_tasks.add(task)
+        task.add_done_callback(_image_batch_tasks.discard)
+
+    future = batch.get(image_page_url)
+    if future is None:
+        future = batch[image_page_url] = asyncio.get_running_loop().create_future()
+
+    # shield: отмена одного из ожидающих не отменяет ответ для остальных
+    return await asyncio.shield(future)
+
+
+# =========================
+# IMAGE BY SCRAPING (страница File:)
+# =========================
+async def get_image_by_scraping(image_page_url: str, ctx: ArticleContext) -> tuple[Image, bool]:
+    """
+    Второе значение — False, если страница File: не загрузилась и вернулась заглушка.
+    """
+    netloc = urlparse(image_page_url).netloc
+    response = await get_request(image_page_url)
+
+    if response.status_code in (404, 429):
+        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE), False
+    if response.status_code != 200:
+        raise Exception(
+            f'Unexpected response code when get image page: {response.status_code}\n'
+            f'Response body: {response.content}'
+        )
+
+    image = await run_in_pool(parse_image_page, response.text, image_page_url, ctx)
+
+    # archive fix
+    if netloc == 'web.archive.org' and image.desc not in (SELF_MADE_IMAGE_CASE, NAZI_IMAGE_CASE):
+        lst = image.desc.split('https://')
+        lst[1] = lst[1][:-1] + 'if_/'
+        req = await get_request('https://'.join(lst))
+        if req.status_code != 200:
+            return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE), False
+        image.desc = req.url
+        image.is_animation = req.url.endswith(".gif")
+
+    return image, True
+
+
+def parse_image_page(html_code: str, image_page_url: str, ctx: ArticleContext) -> Image:
+    """
+    Разбор страницы File: (выполняется в пуле воркеров, без сетевых запросов).
+    """
+    netloc = urlparse(image_page_url).netloc
+    image_soup = make_soup(html_code)
+
+    # nazi image case
+    nazi_img = image_soup.find('img', alt='Nazi symbol')
+    if nazi_img:
+        return pre_image_by_text(ctx, NAZI_IMAGE_CASE)
+
+    image_url = None
+    width_max, height_max = IMAGE_MAX_WIDTH, IMAGE_MAX_HEIGHT
+
+    resolutions_span = image_soup.find('span', class_='mw-filepage-other-resolutions')
+    if resolutions_span:
+        links = resolutions_span.find_all('a', href=True)
+        for link in links[::-1]:
+            clean_text = re.sub(r'[\s,.]+', '', link.text)
+            match = re.search(r'(\d+)[×xX](\d+)', clean_text)
+            if match:
+                width = int(match.group(1))
+                height = int(match.group(2))
+                if width <= width_max and height <= height_max:
+                    image_url = get_quote_url_by_tag(netloc, link)
+                    break
+    else:
+        file_link_tag = image_soup.find('a', class_='internal')
+        if file_link_tag and file_link_tag.has_attr('href'):
+            image_url = get_quote_url_by_tag(netloc, file_link_tag)
+
+    if not image_url:
+        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
+
+    raw_licenses = {
+        re.sub(r'\s+', ' ', tag.get_text(strip=True))
+        for tag in image_soup.find_all(class_=re.compile('licensetpl_short'))
+    }
+
+    image_licenses = normalize_licenses(raw_licenses, ctx)
+    if not image_licenses:
+        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
+
+    image_author_html = fix_known_authors(extract_attrs_info(
+        image_soup,
+        find_kwargs={'class': 'licensetpl_attr'},
+        next_tags=None
+    ))
+
+    if not image_author_html:
+        image_author_html = extract_attrs_info(
+            image_soup,
+            find_kwargs={'id': 'fileinfotpl_aut'},
+            next_tags=('td', 'th')
+        )
+
+    source_html = extract_attrs_info(
+        image_soup,
+        find_kwargs={'id': 'fileinfotpl_src'},
+        next_tags=('td', 'th')
+    )
+
+    if not source_html:
+        return pre_image_by_text(ctx, SELF_MADE_IMAGE_CASE)
+
+    return Image(
+        desc=image_url,
+        licenses=sorted(image_licenses),
+        page_url=image_page_url,
+        author_html=format_image_author(netloc, image_author_html, source_html, ctx),
         is_animation=image_url.endswith(".gif")
     )
 
@@ -233,35 +522,23 @@ def pre_image_by_text(ctx: ArticleContext, desc: str) -> Image:
 # TRIM TEXT
 # =========================
 def get_trimmed_text(paragraphs: list[str], max_length: int) -> str:
-    total_length, text = 0, ''
+    total_length, parts = 0, []
 
     for paragraph in paragraphs:
         paragraph = remove_brackets_by_rules(paragraph)
         paragraph_length = len(paragraph) + 2
 
-        text += paragraph
+        parts.append(paragraph)
 
         if total_length + paragraph_length > max_length:
-            ok, i = False, max_length - 2
-            t = text[:i]
-
-            while not ok:
-                t = str(t[:i].rsplit('.', 1)[0])
+            limit = max_length - 2
+            text = ''.join(parts)[:limit]
+            return cut_at_sentence(text, min(len(text), limit)) + '.\n\n'
 
-                while ends_with_one_char_abbr(t):
-                    split = t.rsplit('.', 1)
-                    if len(split) == 1:
-                        return t + '.\n\n'
-                    t = split[0]
-
-                ok, i = is_balanced(t)
-
-            return t + '.\n\n'
-
-        text += '\n\n'
+        parts.append('\n\n')
         total_length += paragraph_length
 
-    return text
+    return ''.join(parts)
 
 
 # =========================
@@ -315,6 +592,83 @@ def get_caption(
     return caption_beginning + get_trimmed_text(paragraphs, max_text_len) + caption_end
 
 
+def get_caption_key(
+        article: Article,
+        rules_url: str,
+        ctx: ArticleContext,
+        *,
+        use_only_first_paragraph=False,
+        with_attribution=True,
+) -> str:
+    mode = 'first' if use_only_first_paragraph else 'post'
+    return f"{ctx.lang}|{mode}|{int(with_attribution)}|{int(article.image is not None)}|{rules_url}"
+
+
+async def get_stored_caption(
+        article: Article,
+        rules_url: str,
+        ctx: ArticleContext,
+        *,
+        use_only_first_paragraph=False,
+        with_attribution=True,
+) -> str:
+    """
+    get_caption через articles_cache.captions: готовая подпись берётся по ключу,
+    новая — считается и сохраняется для текущей версии строки (updated_at).
+    """
+    options = dict(
+        use_only_first_paragraph=use_only_first_paragraph,
+        with_attribution=with_attribution,
+    )
+
+    key = get_caption_key(article, rules_url, ctx, **options)
+
+    caption = article.captions.get(key)
+    if caption is not None:
+        return caption
+
+    caption = get_caption(article, rules_url, ctx, **options)
+    article.captions[key] = caption
+
+    # статья не сохранена в articles_cache — хранить подпись негде
+    if article.updated_at is not None:
+        await save_article_caption(article.link, article.updated_at, key, caption)
+
+    return caption
+
+
+# =========================
+# TITLE IMAGES
+# =========================
+def is_title_image(image: Image | None) -> bool:
+    return image is not None and image.desc in (SELF_MADE_IMAGE_CASE, NAZI_IMAGE_CASE)
+
+
+async def get_title_image_media(title: str) -> str | io.BytesIO | None:
+    """
+    Картинка с заголовком: file_id после первой загрузки в Telegram, иначе PNG из title_images
+    (рисуется один раз, в пуле воркеров).
+    """
+    row = await get_title_image(title, TITLE_IMAGE_PARAMS)
+
+    if row and row["file_id"]:
+        return row["file_id"]
+
+    if row:
+        return io.BytesIO(row["png"])
+
+    png = await run_in_pool(get_png_by_text, title)
+    if not png:
+        return None
+
+    await save_title_image(title, TITLE_IMAGE_PARAMS, png)
+    return io.BytesIO(png)
+
+
+async def save_title_image_file_id(title: str, file_id: str):
+    await set_title_image_file_id(title, TITLE_IMAGE_PARAMS, file_id)
+
+
 # =========================
 # SEND TO TARGETS (ASYNC)
 # =========================
@@ -323,7 +677,7 @@ async def send_to_targets(context: ContextTypes.DEFAULT_TYPE, article: Article,
     if article.image and article.image.desc == NAZI_IMAGE_CASE:
         article.paragraphs = [ctx.t(TKey.NAZI_REJECT_TEXT)] + article.paragraphs
 
-    caption = get_caption(article, rules_url, ctx)
+    caption = await get_stored_caption(article, rules_url, ctx)
 
     for target in targets:
         if not article.image:
@@ -334,8 +688,8 @@ async def send_to_targets(context: ContextTypes.DEFAULT_TYPE, article: Article,
             )
             continue
 
-        if article.image.desc in (SELF_MADE_IMAGE_CASE, NAZI_IMAGE_CASE):
-            media = get_img_buf_by_text(article.title)  # self-made media
+        if is_title_image(article.image):
+            media = await get_title_image_media(article.title)  # self-made media
         else:
             media = article.image.desc  # file_id или URL
 
@@ -356,9 +710,14 @@ async def send_to_targets(context: ContextTypes.DEFAULT_TYPE, article: Article,
             )
             file_id = msg.photo[-1].file_id
 
-        if article.image.desc != file_id:
+        # desc с маркером не перезаписываем: file_id картинки с заголовком хранится в title_images
+        if is_title_image(article.image):
+            if media != file_id:
+                await save_title_image_file_id(article.title, file_id)
+        elif article.image.desc != file_id:
             article.image.desc = file_id
             await update_image_desc(article.link, file_id)
+            await set_cached_image_file_id(article.image.page_url, file_id)
 
 
 # =========================
@@ -382,72 +741,251 @@ async def get_ctx_req_by_config(config: Config, use_cache=True) -> ArticleContex
     if not use_cache:
         return ArticleContextRequest(ctx, url_start, False)
 
-    url_final = await get_cached_final_url(url_start)
-    if not url_final or not await article_cached(url_final):
-        return ArticleContextRequest(ctx, url_start, False)
-
-    ctx.cached = True
-    return ArticleContextRequest(ctx, url_final, True)
-
-
-async def get_article(
-        config: Config,
-        *,
-        ctx_req: ArticleContextRequest = None,
-) -> tuple[Article | None, ArticleContext]:
-    if not ctx_req:
-        ctx_req = await get_ctx_req_by_config(config, use_cache=config.USE_CACHE_FOR_GETTING_CONTEXT_REQ)
+    # один запрос: итоговый URL, строка articles_cache и последняя избранная статья
+    article, last_title, negative = await resolve_cached_article(
+        url_start, ctx.lang, ctx.with_image,
+        with_last_title=config.USE_AND_UPDATE_LAST_FEATURED_TITLE,
+    )
+    if last_title is None:
+        last_title = ''
 
-    ctx, url, cached = ctx_req.ctx, ctx_req.url, ctx_req.cached
+    if not article:
+        # недавняя неудача (404, не статья, не разобралась) — повтор без обращения к Википедии
+        if config.USE_AND_UPDATE_LAST_FEATURED_TITLE:
+            negative = None
 
-    last_title = ''
-    if config.USE_AND_UPDATE_LAST_FEATURED_TITLE:
-        last_title = await get_last_article(config.LANG_CODE)
+        return ArticleContextRequest(ctx, url_start, False, last_title=last_title, negative=negative)
 
-    if cached:
-        article = await get_article_from_db(url, ctx.with_image)
+    ctx.cached = True
+    return ArticleContextRequest(ctx, article.link, True, article=article, last_title=last_title)
 
-        if article.title == last_title:
-            return None, ctx
 
-        return article, ctx
+async def build_article(url: str, ctx: ArticleContext, last_title: str = '') -> tuple[Article | None, bool]:
+    """
+    Скачивает и разбирает страницу (вместе с изображением), ничего не сохраняя в articles_cache.
+    Второе значение — True, если страница не изменилась и статья взята из БД без парсинга.
+    """
+    response = await get_request_cached(url)
 
-    response = get_request(url)
+    if response.status_code == 404:
+        raise ArticleNotFoundError(f'Unexpected response code: 404 ({url})')
 
     if response.status_code != 200:
         raise Exception(
             f'Unexpected response code: {response.status_code}\n{response.content}'
         )
 
-    response.encoding = 'utf-8'
+    # страница не изменилась и уже разобрана ранее → берём статью из БД без повторного парсинга
+    if response.not_modified and response.article_link:
+        article = await get_article_from_db(response.article_link, ctx.with_image)
+
+        if article and (article.image or not ctx.with_image):
+            if article.title == last_title:
+                return None, True
 
-    parser = LANG_PARSERS.get(ctx.lang) or LANG_PARSERS['en']
-    soup = clean_soup(BeautifulSoup(response.text, 'html.parser'))
+            return article, True
 
-    parser_res = parser(soup, unquote_url(response.url), last_title)
-    article, netloc, main_block = parser_res.article, parser_res.netloc, parser_res.main_block
+    parsed = await run_in_pool(
+        parse_article_page,
+        response.text,
+        unquote_url(response.url),
+        ctx.lang,
+        last_title,
+        ctx.with_image,
+    )
+    article = parsed.article
 
     if not article:
-        return None, ctx
+        return None, False
 
     if ctx.with_image:
-        article.image = get_image_by_tag(netloc, main_block, ctx)
+        article.image = await get_image_by_page_url(parsed.image_page_url, ctx)
 
     article.link = quote_url(article.link)
+
+    return article, False
+
+
+def parse_article_page(html_code: str, url: str, lang: str, last_title: str, with_image: bool) -> ParsedArticle:
+    """
+    Стадия парсинга: soup → clean_soup → LANG_PARSERS[lang] → Article.
+    Выполняется в пуле воркеров, поэтому возвращает только picklable-данные.
+    """
+    parser = LANG_PARSERS.get(lang) or LANG_PARSERS['en']
+    soup = clean_soup(make_soup(html_code, ARTICLE_PARSE_ONLY))
+
+    parser_res = parser(soup, url, last_title)
+    if not parser_res.article:
+        return ParsedArticle(None)
+
+    image_page_url = get_image_page_url(parser_res.netloc, parser_res.main_block) if with_image else None
+    return ParsedArticle(parser_res.article, image_page_url)
+
+
+async def _save_negative(url: str, reason: str):
+    await save_negative_result(url, reason, NEGATIVE_CACHE_TTL_MINUTES[reason])
+
+
+async def _store_article(config: Config, ctx: ArticleContext, url: str, article: Article, remember_failure: bool):
     url_final = article.link
 
     is_article_original = await is_article(ctx.lang, url)
     is_article_final = await is_article(ctx.lang, url_final)
 
+    # не статья — отказ уже на первом запросе, как и на повторных из negative_cache
+    if not is_article_final and remember_failure:
+        await _save_negative(url, NEGATIVE_NOT_ARTICLE)
+        raise NotAnArticleError(f'Not an article: {url_final} ({url})')
+
     if is_article_final and config.SAVE_ARTICLE_TO_DB:
+        # загрузилась (например, после /update) — прежняя неудача больше не действует
+        if remember_failure:
+            await delete_negative_result(url)
+
         await save_article_to_db(article)
         if is_article_original:
             await set_cached_final_url(url, url_final)
         await set_cached_final_url(url_final, url_final)
+        await set_http_cache_article_link(url, url_final)
+
+
+async def _load_article(config: Config, ctx: ArticleContext, url: str, last_title: str) -> Article | None:
+    # для скриптов с last_title None — «статья не сменилась», а не неудача
+    remember_failure = config.SAVE_ARTICLE_TO_DB and not config.USE_AND_UPDATE_LAST_FEATURED_TITLE
+
+    try:
+        article, unchanged = await build_article(url, ctx, last_title)
+    except ArticleNotFoundError:
+        if remember_failure:
+            await _save_negative(url, NEGATIVE_NOT_FOUND)
+        raise
+
+    if not article:
+        if remember_failure:
+            await _save_negative(url, NEGATIVE_PARSE_FAILED)
+        return None
+
+    # страница не изменилась (304) — статья уже в articles_cache, запись в кеш не нужна
+    if not unchanged:
+        await _store_article(config, ctx, url, article, remember_failure)
 
     if config.USE_AND_UPDATE_LAST_FEATURED_TITLE:
         await update_featured_articles_in_db(ctx.lang, {article.title})
 
+    return article
+
+
+# =========================
+# REVALIDATE
+# =========================
+def _content_key(article: Article) -> Article:
+    # desc в БД мог стать file_id Telegram — само изображение сравнивается без него (кроме служебных значений)
+    image = article.image
+    if image and image.desc not in (SELF_MADE_IMAGE_CASE, NAZI_IMAGE_CASE):
+        image = replace(image, desc='')
+
+    return replace(article, image=image)
+
+
+async def revalidate_cached_article(link: str) -> bool:
+    """
+    Сверяет статью из articles_cache с Википедией через условный GET.
+    Строка перезаписывается, только если содержимое изменилось. True — статья обновлена.
+    """
+    ctx = ArticleContext(lang=urlparse(link).netloc.split('.')[0], url_or_title=link, with_image=True, cached=False)
+
+    try:
+        article, unchanged = await build_article(link, ctx)
+
+        # не статья или страница теперь перенаправляет на другую — такие обновятся при обычном запросе
+        if unchanged or not article or article.link != link:
+            return False
+
+        # следующая проверка при 304 обойдётся без парсинга
+        await set_http_cache_article_link(link, link)
+
+        old = await get_article_from_db(link, True)
+        if old and _content_key(old) == _content_key(article):
+            return False
+
+        await save_article_to_db(article)
+        return True
+    finally:
+        await mark_article_checked(link)
+
+
+# =========================
+# SINGLE-FLIGHT
+# =========================
+_inflight: dict[tuple, asyncio.Task] = {}
+
+
+async def _single_flight(key: tuple, factory: Callable[[], Awaitable[Article | None]]) -> Article | None:
+    """
+    Одновременные запросы с одинаковым ключом ждут одну и ту же задачу (один запрос к Википедии,
+    один парсинг, одна запись в БД). Каждый получает свою копию статьи, т.к. render её изменяет.
+    """
+    task = _inflight.get(key)
+
+    if task is None:
+        task = asyncio.create_task(factory())
+        _inflight[key] = task
+
+        def _forget(_):
+            if _inflight.get(key) is task:
+                del _inflight[key]
+
+        task.add_done_callback(_forget)
+
+    # shield: отмена одного из ожидающих не отменяет общую задачу
+    article = await asyncio.shield(task)
+    return copy.deepcopy(article)
+
+
+async def get_article(
+        config: Config,
+        *,
+        ctx_req: ArticleContextRequest = None,
+) -> tuple[Article | None, ArticleContext]:
+    if not ctx_req:
+        ctx_req = await get_ctx_req_by_config(config, use_cache=config.USE_CACHE_FOR_GETTING_CONTEXT_REQ)
+
+    ctx, url, cached = ctx_req.ctx, ctx_req.url, ctx_req.cached
+
+    last_title = ''
+    if config.USE_AND_UPDATE_LAST_FEATURED_TITLE:
+        last_title = ctx_req.last_title
+        if last_title is None:
+            last_title = await get_last_article(config.LANG_CODE)
+
+    if ctx_req.negative == NEGATIVE_NOT_FOUND:
+        raise ArticleNotFoundError(f'Unexpected response code: 404 ({url}, cached)')
+
+    if ctx_req.negative == NEGATIVE_NOT_ARTICLE:
+        raise NotAnArticleError(f'Not an article: {url} (cached)')
+
+    if ctx_req.negative:
+        return None, ctx
+
+    if cached:
+        article = ctx_req.article or await get_article_from_db(url, ctx.with_image)
+        record_article_hit(url)
+
+        if article.title == last_title:
+            return None, ctx
+
+        return article, ctx
+
+    key = (
+        url,
+        ctx.lang,
+        ctx.with_image,
+        last_title,
+        config.SAVE_ARTICLE_TO_DB,
+        config.USE_AND_UPDATE_LAST_FEATURED_TITLE,
+    )
+    article = await _single_flight(key, lambda: _load_article(config, ctx, url, last_title))
+
     return article, ctx
 
 
@@ -475,6 +1013,7 @@ async def run(context: ContextTypes.DEFAULT_TYPE, config: Config) -> bool:
 # =========================
 async def runner(async_main_for_bot, is_test: bool):
     await init_db(DB_TEST_NAME if is_test else DB_NAME)
+    await init_http()
 
     app = get_app(is_test)
 
@@ -487,6 +1026,8 @@ async def runner(async_main_for_bot, is_test: bool):
     finally:
         await app.stop()
         await app.shutdown()
+        await close_http()
+        shutdown_executor()
         await close_db()
 
 
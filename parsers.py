@@ -1,11 +1,11 @@
 from typing import Optional, Callable
 
-from bs4 import BeautifulSoup, Tag
+from bs4 import BeautifulSoup, Tag, SoupStrainer
 
-from constants import User_Agent
+from fetch import get_text
 from filter import get_skip_prefixes
 from models import Article, ParseResult
-from utils import get_quote_url_by_tag, get_paragraphs, filter_soup, split_url, quote_url
+from utils import get_quote_url_by_tag, get_paragraphs, filter_soup, split_url, quote_url, make_soup
 
 NONE_RESULT = ParseResult(None, None, None)
 
@@ -318,9 +318,11 @@ LANG_PARSERS = {
     'pl': parse_pl,
 }
 
+# Все парсеры из LANG_PARSERS (включая заглавные страницы) читают только
+# заголовок и #mw-content-text — остальная страница в дерево не попадает
+ARTICLE_PARSE_ONLY = SoupStrainer(id=['mw-content-text', 'firstHeading'])
+
 from typing import Dict
-import aiohttp
-from bs4 import BeautifulSoup, Tag
 
 
 # =========================
@@ -328,12 +330,7 @@ from bs4 import BeautifulSoup, Tag
 # =========================
 
 async def fetch_html(url: str) -> str:
-    headers = {"User-Agent": User_Agent}
-
-    async with aiohttp.ClientSession(headers=headers) as session:
-        async with session.get(url) as resp:
-            resp.raise_for_status()
-            return await resp.text()
+    return await get_text(url)
 
 
 def extract_titles(
@@ -398,34 +395,42 @@ LANG_FINDER_CONFIG: Dict[str, Dict] = {
     "ru": {
         "url": "https://ru.wikipedia.org/wiki/Википедия:Избранные_статьи",
         "finder": lambda soup: soup.find("section", {"aria-labelledby": "Все_избранные_статьи"}),
+        "parse_only": SoupStrainer("section", attrs={"aria-labelledby": "Все_избранные_статьи"}),
     },
     "en": {
         "url": "https://en.wikipedia.org/wiki/Wikipedia:Featured_articles",
         "finder": lambda soup: soup.find_all("div", class_="wp-fa-contents")[1],
+        "parse_only": SoupStrainer("div", class_="wp-fa-contents"),
     },
     "fr": {
         "url": "https://fr.wikipedia.org/wiki/Wikipédia:Contenus_de_qualité",
         "finder": lambda soup: soup.find_all("div", class_="cadre-colore cdq-cadre")[2:-1],
+        "parse_only": SoupStrainer("div", class_="cadre-colore cdq-cadre"),
     },
     "de": {
         "url": "https://de.wikipedia.org/wiki/Wikipedia:Exzellente_Artikel",
         "special": extract_de,
+        "parse_only": SoupStrainer("tbody", id="mwBA"),
     },
     "es": {
         "url": "https://es.wikipedia.org/wiki/Wikipedia:Artículos_destacados",
         "finder": lambda soup: soup.find("table", attrs={"about": "#mwt9"}),
+        "parse_only": SoupStrainer("table", attrs={"about": "#mwt9"}),
     },
     "it": {
         "url": "https://it.wikipedia.org/wiki/Wikipedia:Vetrina",
         "finder": lambda soup: soup.find("div", class_="itwiki-vetrina", attrs={"id": "mwDg"}),
+        "parse_only": SoupStrainer("div", class_="itwiki-vetrina", attrs={"id": "mwDg"}),
     },
     "pt": {
         "url": "https://pt.wikipedia.org/wiki/Wikipédia:Artigos_destacados",
         "finder": lambda soup: soup.find_all("table", attrs={"typeof": "mw:Transclusion"})[-1],
+        "parse_only": SoupStrainer("table", attrs={"typeof": "mw:Transclusion"}),
     },
     "pl": {
         "url": "https://pl.wikipedia.org/wiki/Wikipedia:Artykuły_na_Medal",
         "finder": lambda soup: soup.find("div", class_="mw-content-ltr mw-parser-output"),
+        "parse_only": SoupStrainer("div", class_="mw-content-ltr mw-parser-output"),
     },
 }
 
@@ -442,7 +447,13 @@ async def fetch_featured_titles(lang: str) -> set[str]:
     skip_prefixes = await get_skip_prefixes(lang)
 
     html = await fetch_html(cfg["url"])
-    soup = BeautifulSoup(html, "html.parser")
+    return extract_featured_titles(lang, html, skip_prefixes)
+
+
+def extract_featured_titles(lang: str, html: str, skip_prefixes: tuple[str, ...]) -> set[str]:
+    cfg = LANG_FINDER_CONFIG[lang]
+    # в дерево попадают только поддеревья, которые ищет finder / special
+    soup = make_soup(html, cfg.get("parse_only"))
 
     # special cases
     if "special" in cfg:
@@ -38,6 +38,49 @@ CREATE TABLE IF NOT EXISTS global_limits (
     total INT NOT NULL DEFAULT 0
 );
 
+-- Проверка и списание дневной квоты за один запрос.
+-- Строки блокируются всегда в одном порядке (сначала общая, потом пользователя),
+-- поэтому параллельные вызовы не превышают лимиты и не дедлочатся.
+-- День передаёт бот (UTC, utils.get_today), а не CURRENT_DATE часового пояса БД.
+-- Прежняя версия без p_day удаляется, чтобы не осталась перегрузка.
+DROP FUNCTION IF EXISTS consume_quota(BIGINT, INT, INT);
+CREATE OR REPLACE FUNCTION consume_quota(p_user_id BIGINT, p_user_limit INT, p_total_limit INT, p_day DATE)
+RETURNS TABLE (allowed BOOLEAN, user_remaining INT, total_remaining INT)
+LANGUAGE plpgsql AS $$
+DECLARE
+    v_total INT;
+    v_count INT;
+BEGIN
+    INSERT INTO global_limits AS g (date, total)
+    VALUES (p_day, 0)
+    ON CONFLICT (date) DO NOTHING;
+
+    SELECT g.total INTO v_total
+    FROM global_limits AS g
+    WHERE g.date = p_day
+    FOR UPDATE;
+
+    INSERT INTO user_limits AS u (user_id, date, count)
+    VALUES (p_user_id, p_day, 0)
+    ON CONFLICT (user_id, date) DO NOTHING;
+
+    SELECT u.count INTO v_count
+    FROM user_limits AS u
+    WHERE u.user_id = p_user_id AND u.date = p_day
+    FOR UPDATE;
+
+    IF v_total >= p_total_limit OR v_count >= p_user_limit THEN
+        RETURN QUERY SELECT FALSE, GREATEST(p_user_limit - v_count, 0), GREATEST(p_total_limit - v_total, 0);
+        RETURN;
+    END IF;
+
+    UPDATE global_limits AS g SET total = g.total + 1 WHERE g.date = p_day;
+    UPDATE user_limits AS u SET count = u.count + 1 WHERE u.user_id = p_user_id AND u.date = p_day;
+
+    RETURN QUERY SELECT TRUE, p_user_limit - v_count - 1, p_total_limit - v_total - 1;
+END;
+$$;
+
 CREATE TABLE IF NOT EXISTS featured_articles (
     id SERIAL PRIMARY KEY,
     lang TEXT NOT NULL,
@@ -65,6 +108,20 @@ ADD COLUMN IF NOT EXISTS is_disambig BOOLEAN DEFAULT FALSE;
 ALTER TABLE articles_cache
 ADD COLUMN IF NOT EXISTS disambig_titles JSONB DEFAULT '[]'::jsonb;
 
+-- готовые подписи (ключ — язык, режим, страница, атрибуция, наличие картинки, rules_url);
+-- сбрасываются при каждом обновлении статьи
+ALTER TABLE articles_cache
+ADD COLUMN IF NOT EXISTS captions JSONB NOT NULL DEFAULT '{}'::jsonb;
+
+-- фоновая ревалидация: сколько раз статью отдавали из кеша и когда её последний раз сверяли с Википедией
+ALTER TABLE articles_cache
+ADD COLUMN IF NOT EXISTS hits INT NOT NULL DEFAULT 0;
+
+ALTER TABLE articles_cache
+ADD COLUMN IF NOT EXISTS checked_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS articles_cache_checked_at_idx ON articles_cache (checked_at);
+
 CREATE TABLE IF NOT EXISTS quote_url_cache (
     url_start TEXT PRIMARY KEY,
     url_final TEXT NOT NULL
@@ -81,4 +138,51 @@ CREATE TABLE IF NOT EXISTS process_heartbeat (
     pid INTEGER NOT NULL,
     pid_created_at TIMESTAMPTZ NOT NULL,
     updated_at TIMESTAMPTZ NOT NULL
-);
\ No newline at end of file
+);
+
+-- =========================
+-- HTTP CACHE (conditional GET: ETag / Last-Modified)
+-- =========================
+CREATE TABLE IF NOT EXISTS http_cache (
+    url TEXT PRIMARY KEY,
+    final_url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    expires_at TIMESTAMPTZ,
+    body BYTEA NOT NULL,
+    size INT NOT NULL,
+    article_link TEXT,
+    accessed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS http_cache_accessed_at_idx ON http_cache (accessed_at);
+
+-- разобранные страницы File: (models.Image) — общие для всех статей с этим изображением
+CREATE TABLE IF NOT EXISTS image_cache (
+    page_url TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    image JSONB NOT NULL,
+    file_id TEXT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (page_url, lang)
+);
+
+-- картинки с заголовком (SELF_MADE_IMAGE_CASE / NAZI_IMAGE_CASE) и их file_id в Telegram
+CREATE TABLE IF NOT EXISTS title_images (
+    text TEXT NOT NULL,
+    params TEXT NOT NULL,
+    png BYTEA NOT NULL,
+    file_id TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (text, params)
+);
+
+-- неудачные запросы статей (not_found / not_article / parse_failed), чтобы повтор не ходил в Википедию
+CREATE TABLE IF NOT EXISTS negative_cache (
+    url TEXT PRIMARY KEY,
+    reason TEXT NOT NULL,
+    expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS negative_cache_expires_at_idx ON negative_cache (expires_at);
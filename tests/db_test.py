@@ -1,5 +1,15 @@
 import asyncio
+import time
+
+import db
+from bot.services import quota
+from bot.services.access import consume_quota
+from constants import DB_TEST_NAME, DAILY_USER_LIMIT, DAILY_TOTAL_LIMIT
 from db import init_db, close_db
+from models import Article
+
+BENCH_LANG = "bench"
+BENCH_TITLES = 100_000
 
 
 async def test():
@@ -8,5 +18,301 @@ async def test():
     await close_db()
 
 
+async def benchmark_random_featured(picks: int = 200):
+    """
+    ORDER BY RANDOM() против выбора из списка в памяти на 100k заголовков.
+    """
+    await init_db(DB_TEST_NAME)
+
+    try:
+        await db.clear_all_featured_articles_in_db(BENCH_LANG)
+        await db.update_featured_articles_in_db(BENCH_LANG, {f"Title {i}" for i in range(BENCH_TITLES)})
+
+        start = time.perf_counter()
+        for _ in range(picks):
+            await db.pool.fetchval(
+                "SELECT title FROM featured_articles WHERE lang = $1 ORDER BY RANDOM() LIMIT 1",
+                BENCH_LANG
+            )
+        order_by_random = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await db.get_random_featured_title(BENCH_LANG)
+        first_load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        recent = []
+        for _ in range(picks):
+            recent.append(await db.get_random_featured_title(BENCH_LANG, user_id=1))
+        in_memory = time.perf_counter() - start
+
+        # последние RANDOM_NO_REPEAT выборов пользователя не повторяются
+        for i in range(len(recent)):
+            window = recent[max(0, i - db.RANDOM_NO_REPEAT + 1):i + 1]
+            assert len(window) == len(set(window)), window
+
+        print(f"ORDER BY RANDOM(): {order_by_random / picks * 1000:.2f} ms per pick")
+        print(f"in-memory: {in_memory / picks * 1000:.4f} ms per pick (first load {first_load * 1000:.1f} ms)")
+    finally:
+        await db.clear_all_featured_articles_in_db(BENCH_LANG)
+        await close_db()
+
+
+# =========================
+# CACHE RESOLUTION
+# =========================
+async def benchmark_resolve(lookups: int = 500):
+    """
+    Кешированная статья: три запроса (URL, наличие, строка) + последняя статья против одного resolve_cached_article
+    и против LRU в памяти.
+    """
+    await init_db(DB_TEST_NAME)
+
+    url_start = "https://bench.wikipedia.org/wiki/Start"
+    url_final = "https://bench.wikipedia.org/wiki/Final"
+    article = Article(
+        title="Final",
+        paragraphs=["Paragraph."] * 5,
+        link=url_final,
+        image=None,
+        is_disambig=False,
+        disambig_titles=[],
+    )
+
+    try:
+        await db.save_article_to_db(article)
+        await db.set_cached_final_url(url_start, url_final)
+
+        start = time.perf_counter()
+        for _ in range(lookups):
+            link = await db.pool.fetchval("SELECT url_final FROM quote_url_cache WHERE url_start = $1", url_start)
+            assert await db.article_cached(link)
+            row = await db.pool.fetchrow("SELECT * FROM articles_cache WHERE link = $1", link)
+            await db.get_last_article(BENCH_LANG)
+        separate = Article.from_db(row, True)
+        three_queries = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(lookups):
+            db.invalidate_article(url_final)
+            joined, last_title, _ = await db.resolve_cached_article(url_start, BENCH_LANG, True)
+        one_query = time.perf_counter() - start
+
+        assert joined == separate and last_title == ""
+        assert await db.resolve_cached_article(url_start + "_missing", BENCH_LANG, True) == (None, "", None)
+
+        stats = db.article_cache_stats.copy()
+        start = time.perf_counter()
+        for _ in range(lookups):
+            remembered, _, _ = await db.resolve_cached_article(url_start, BENCH_LANG, True, with_last_title=False)
+        in_memory = time.perf_counter() - start
+
+        assert remembered == separate
+        assert db.article_cache_stats["hit"] - stats["hit"] == lookups
+
+        print(f"separate queries: {three_queries / lookups * 1000:.2f} ms per lookup")
+        print(f"resolve_cached_article: {one_query / lookups * 1000:.2f} ms per lookup")
+        print(f"in-memory LRU: {in_memory / lookups * 1000:.4f} ms per lookup")
+
+        await check_article_lru(url_start, url_final)
+    finally:
+        await db.pool.execute("DELETE FROM articles_cache WHERE link = $1", url_final)
+        await db.pool.execute("DELETE FROM quote_url_cache WHERE url_final = $1", url_final)
+        await close_db()
+
+
+async def check_article_lru(url_start: str, url_final: str):
+    """
+    Копии не делят изменяемые поля, запись в БД сбрасывает память, устаревшая запись отдаётся и перечитывается.
+    """
+    first, _, _ = await db.resolve_cached_article(url_start, BENCH_LANG, True, with_last_title=False)
+    first.captions["key"] = "changed"
+    second, _, _ = await db.resolve_cached_article(url_start, BENCH_LANG, True, with_last_title=False)
+    assert "key" not in second.captions
+
+    await db.pool.execute("UPDATE articles_cache SET title = 'Changed' WHERE link = $1", url_final)
+
+    # устарела: сразу старое значение, затем в фоне — новое
+    article, loaded_at = db._article_lru[url_final]
+    db._article_lru[url_final] = (article, loaded_at - db.ARTICLE_LRU_STALE_MINUTES * 60)
+
+    stale, _, _ = await db.resolve_cached_article(url_start, BENCH_LANG, True, with_last_title=False)
+    assert stale.title == "Final"
+    await asyncio.gather(*db._article_refreshing.values())
+
+    fresh, _, _ = await db.resolve_cached_article(url_start, BENCH_LANG, True, with_last_title=False)
+    assert fresh.title == "Changed"
+
+    second.title = "Saved"
+    await db.save_article_to_db(second)
+    assert url_final not in db._article_lru
+
+    saved = await db.get_article_from_db(url_final, False)
+    assert saved.title == "Saved" and saved.image is None
+
+    print("article LRU OK")
+
+
+# =========================
+# NEGATIVE CACHE
+# =========================
+async def check_negative_cache():
+    await init_db(DB_TEST_NAME)
+
+    url = "https://bench.wikipedia.org/wiki/No_such_article"
+
+    async def negative():
+        _, _, reason = await db.resolve_cached_article(url, BENCH_LANG, False, with_last_title=False)
+        return reason
+
+    try:
+        assert await negative() is None
+
+        await db.save_negative_result(url, "not_found", 1)
+        assert await negative() == "not_found"
+
+        # из БД (тем же запросом, что и статья), когда в памяти записи нет
+        db._negative.clear()
+        assert await negative() == "not_found"
+
+        # истёкшая запись не отдаётся и вычищается
+        await db.save_negative_result(url, "parse_failed", -1)
+        assert await negative() is None
+        db._negative.clear()
+        assert await negative() is None
+        assert await db.evict_negative_results() >= 1
+
+        # успешная загрузка снимает запись
+        await db.save_negative_result(url, "not_found", 1)
+        await db.delete_negative_result(url)
+        db._negative.clear()
+        assert await negative() is None
+
+        print("negative cache OK")
+    finally:
+        await db.delete_negative_result(url)
+        await close_db()
+
+
+# =========================
+# QUOTA
+# =========================
+QUOTA_USERS = range(-1000, 0)  # отрицательные id не пересекаются с настоящими пользователями
+
+
+# Прежняя проверка (четыре запроса в транзакции без блокировок) — для сравнения
+async def _reference_check_and_increment_limit(user_id: int) -> bool:
+    day = quota.today()
+
+    async with db.pool.acquire() as conn:
+        async with conn.transaction():
+            total = await conn.fetchval("SELECT total FROM global_limits WHERE date = $1", day) or 0
+            if total >= DAILY_TOTAL_LIMIT:
+                return False
+
+            count = await conn.fetchval(
+                "SELECT count FROM user_limits WHERE user_id=$1 AND date=$2", user_id, day
+            ) or 0
+            if count >= DAILY_USER_LIMIT:
+                return False
+
+            await conn.execute(
+                """
+                INSERT INTO user_limits(user_id, date, count) VALUES($1, $2, 1)
+                ON CONFLICT (user_id, date) DO UPDATE SET count = user_limits.count + 1
+                """,
+                user_id, day
+            )
+            await conn.execute(
+                """
+                INSERT INTO global_limits(date, total) VALUES($1, 1)
+                ON CONFLICT (date) DO UPDATE SET total = global_limits.total + 1
+                """,
+                day
+            )
+            return True
+
+
+async def _reset_quota(total_before: int):
+    await db.pool.execute("DELETE FROM user_limits WHERE user_id < 0")
+    await db.pool.execute(
+        """
+        INSERT INTO global_limits(date, total) VALUES($1, $2)
+        ON CONFLICT (date) DO UPDATE SET total = EXCLUDED.total
+        """,
+        quota.today(), total_before
+    )
+
+
+async def _run_quota(check, requests_per_user: int) -> tuple[float, int]:
+    calls = [uid for uid in QUOTA_USERS for _ in range(requests_per_user)]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(check(uid) for uid in calls))
+    elapsed = time.perf_counter() - start
+
+    return elapsed / len(calls), sum(bool(r) for r in results)
+
+
+async def benchmark_quota(requests_per_user: int = 10):
+    """
+    Много пользователей одновременно: задержка на проверку и соблюдение лимитов.
+    Суммарно запросов больше DAILY_TOTAL_LIMIT, чтобы упереться в общий лимит.
+    """
+    await init_db(DB_TEST_NAME)
+
+    total_before = await db.get_global_limit(quota.today())
+    await db.pool.executemany(
+        "INSERT INTO users(user_id) VALUES($1) ON CONFLICT DO NOTHING",
+        [(uid,) for uid in QUOTA_USERS]
+    )
+
+    async def atomic(uid):
+        allowed, _, _ = await consume_quota(uid)
+        return allowed
+
+    async def in_memory(uid):
+        allowed, _, _ = quota.try_consume(uid)
+        return allowed
+
+    try:
+        for name, check in (
+                ("4 statements", _reference_check_and_increment_limit),
+                ("consume_quota", atomic),
+                ("in-memory", in_memory),
+        ):
+            await _reset_quota(0)
+            await quota.load_quota()
+
+            latency, allowed = await _run_quota(check, requests_per_user)
+
+            start = time.perf_counter()
+            await quota.flush_quota()
+            flush = time.perf_counter() - start
+
+            total = await db.get_global_limit(quota.today())
+            max_user = await db.pool.fetchval(
+                "SELECT COALESCE(MAX(count), 0) FROM user_limits WHERE user_id < 0 AND date = $1", quota.today()
+            )
+
+            print(
+                f"{name}: {latency * 1000:.2f} ms per check, allowed {allowed}, "
+                f"global {total}/{DAILY_TOTAL_LIMIT}, max per user {max_user}/{DAILY_USER_LIMIT}, "
+                f"flush {flush * 1000:.1f} ms"
+            )
+
+            if check is not _reference_check_and_increment_limit:
+                assert total <= DAILY_TOTAL_LIMIT and max_user <= DAILY_USER_LIMIT
+                assert allowed == total
+    finally:
+        await _reset_quota(total_before)
+        await db.pool.execute("DELETE FROM users WHERE user_id < 0")
+        await close_db()
+
+
 if __name__ == "__main__":
     asyncio.run(test())
+    asyncio.run(benchmark_random_featured())
+    asyncio.run(benchmark_resolve())
+    asyncio.run(check_negative_cache())
+    asyncio.run(benchmark_quota())
@@ -0,0 +1,34 @@
+import asyncio
+
+import filter
+from filter import is_article
+
+# префиксы пространств имён без запроса к API (обычно берутся из siteinfo и БД)
+SKIP_PREFIXES = ("Категория:", "Файл:", "Служебная:", "Шаблон:", "Википедия:")
+
+CASES = {
+    "https://ru.wikipedia.org/wiki/Меркурий": True,
+    "https://ru.wikipedia.org/wiki/%D0%9C%D0%B5%D1%80%D0%BA%D1%83%D1%80%D0%B8%D0%B9": True,
+    "https://ru.wikipedia.org/wiki/Меркурий_(планета)": True,
+    "https://ru.wikipedia.org/wiki/Категория:Планеты": False,
+    "https://ru.wikipedia.org/wiki/Файл:Mercury.jpg": False,
+    "https://ru.wikipedia.org/wiki/Заглавная_страница": False,
+    "https://ru.wikipedia.org/wiki/Шаблон:Текущая_избранная_статья": False,
+    "https://en.wikipedia.org/wiki/Mercury_(planet)": False,
+    "https://ru.wikipedia.org/w/index.php?title=Меркурий": False,
+    "https://web.archive.org/web/2/https://ru.wikipedia.org/wiki/Меркурий": False,
+}
+
+
+def test_is_article():
+    filter._skip_cache["ru"] = SKIP_PREFIXES
+
+    async def check():
+        return {url: await is_article("ru", url) for url in CASES}
+
+    assert asyncio.run(check()) == CASES
+    print("is_article OK")
+
+
+if __name__ == "__main__":
+    test_is_article()
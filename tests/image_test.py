@@ -0,0 +1,290 @@
+import asyncio
+import json
+import os
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+from aiohttp import web
+
+import parse
+import utils
+from constants import SELF_MADE_IMAGE_CASE, NAZI_IMAGE_CASE, FONT_PATH
+from fetch import close_http
+from i18n import TKey
+from models import ArticleContext, HTTPResponse
+from parse import get_images_by_api, parse_image_page, resolve_image
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "imageinfo.json")
+MULTI_LICENSE_PAGE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "fixtures", "offline", "ru-file-multi-license.html"
+)
+
+
+# =========================
+# LOCAL STAND-IN OF MEDIAWIKI API
+# =========================
+async def _start_api(requests_log: list[dict]) -> tuple[web.AppRunner, int]:
+    with open(FIXTURE_PATH, "r", encoding="utf-8") as f:
+        fixture = json.load(f)
+
+    async def api(request: web.Request):
+        requests_log.append(dict(request.query))
+        return web.json_response(fixture)
+
+    app = web.Application()
+    app.router.add_get("/w/api.php", api)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, port
+
+
+async def _check_images_by_api():
+    requests_log = []
+    runner, port = await _start_api(requests_log)
+
+    ctx = ArticleContext(lang="ru", url_or_title="Меркурий", with_image=True, cached=False)
+    base = f"http://127.0.0.1:{port}/wiki/"
+
+    mercury = base + "Файл:mercury_in_color_-_Prockter07_centered.jpg"
+    earth = base + "Файл:Rotating_earth_(large).gif"
+    nazi = base + "Файл:Reichsadler_der_Deutsches_Reich_(1935–1945).svg"
+    logo = base + "Файл:Logo_Example.png"
+    multi = base + "Файл:Multi_license_example.jpg"
+    missing = base + "Файл:No_such_file.jpg"
+
+    try:
+        images = await get_images_by_api([mercury, earth, nazi, logo, multi, missing], ctx)
+    finally:
+        await close_http()
+        await runner.cleanup()
+
+    # все файлы — одним запросом
+    assert len(requests_log) == 1, requests_log
+    assert requests_log[0]["titles"].count("|") == 5
+
+    image = images[mercury]
+    assert image.desc.endswith("/2000px-Mercury_in_color_-_Prockter07_centered.jpg")
+    assert image.licenses == [ctx.t(TKey.PUBLIC_DOMAIN)]
+    assert image.page_url == mercury
+    assert 'href="https://photojournal.jpl.nasa.gov/catalog/PIA11245"' in image.author_html
+    assert not image.is_animation
+
+    image = images[earth]
+    assert image.licenses == ["CC BY-SA"]
+    assert "https://commons.wikimedia.org/wiki/User:Marvel" in image.author_html
+    assert image.is_animation
+
+    assert images[nazi].desc == NAZI_IMAGE_CASE
+    assert images[logo].desc == SELF_MADE_IMAGE_CASE
+    assert images[missing] is None
+
+    # несколько лицензий — тот же Image, что и при скрапинге страницы файла
+    with open(MULTI_LICENSE_PAGE, "r", encoding="utf-8") as f:
+        scraped = parse_image_page(f.read(), multi, ctx)
+    assert images[multi].licenses == ["CC BY-SA 3.0", "GFDL"]
+    assert images[multi] == scraped
+
+    print("imageinfo API engine OK")
+
+
+def test_images_by_api():
+    asyncio.run(_check_images_by_api())
+
+
+async def _check_concurrent_lookups_batched():
+    requests_log = []
+    runner, port = await _start_api(requests_log)
+
+    ctx = ArticleContext(lang="ru", url_or_title="Меркурий", with_image=True, cached=False)
+    base = f"http://127.0.0.1:{port}/wiki/"
+    urls = [
+        base + "Файл:mercury_in_color_-_Prockter07_centered.jpg",
+        base + "Файл:Rotating_earth_(large).gif",
+        base + "Файл:Multi_license_example.jpg",
+    ]
+
+    try:
+        results = await asyncio.gather(*(resolve_image(url, ctx) for url in urls))
+    finally:
+        await close_http()
+        await runner.cleanup()
+
+    # одновременные статьи (warm.py, prewarm) — один запрос к API на все их файлы
+    assert len(requests_log) == 1, requests_log
+    assert all(resolved for _, resolved in results)
+    assert [image.page_url for image, _ in results] == urls
+
+
+def test_concurrent_lookups_batched():
+    asyncio.run(_check_concurrent_lookups_batched())
+
+
+# =========================
+# IMAGE CACHE
+# =========================
+def test_failed_image_page_not_cached():
+    """
+    Заглушка из-за 429/404 на странице File: не попадает в image_cache.
+    """
+    saved = []
+    statuses = iter([429, 404])
+
+    async def get_request(url):
+        return HTTPResponse(status_code=next(statuses), url=url, content=b"")
+
+    async def get_cached_image(page_url, lang):
+        return None
+
+    async def save_cached_image(page_url, lang, image):
+        saved.append(page_url)
+
+    patched = {
+        "get_request": get_request,
+        "get_cached_image": get_cached_image,
+        "save_cached_image": save_cached_image,
+        "IMAGE_METADATA_ENGINE": "scraping",
+    }
+    original = {name: getattr(parse, name) for name in patched}
+
+    ctx = ArticleContext(lang="ru", url_or_title="Меркурий", with_image=True, cached=False)
+    url = "https://ru.wikipedia.org/wiki/Файл:Mercury.jpg"
+
+    try:
+        for name, value in patched.items():
+            setattr(parse, name, value)
+
+        for _ in range(2):
+            image = asyncio.run(parse.get_image_by_link(url, ctx))
+            assert image.desc == SELF_MADE_IMAGE_CASE
+    finally:
+        for name, value in original.items():
+            setattr(parse, name, value)
+
+    assert saved == []
+    print("failed File: pages are not cached")
+
+
+# =========================
+# TITLE IMAGES (draw_centered_text)
+# =========================
+TITLES = [
+    "Меркурий",
+    "Список объектов всемирного наследия ЮНЕСКО в Российской Федерации",
+    "Liste der denkmalgeschützten Objekte in der Inneren Stadt (Wien)/Freyung bis Herrengasse",
+    "Ordre national de la Légion d'honneur — liste des grands-croix sous la Troisième République",
+    "Wojna polsko-bolszewicka: bitwa warszawska i jej następstwa dla Europy Środkowo-Wschodniej",
+    "Lista de obras de arte del Museo Nacional de Arte de Cataluña pertenecientes al período románico",
+]
+
+
+# Прежняя реализация (шрифт и textbbox на каждый кегль) — эталон для сравнения и бенчмарка
+def _reference_draw_centered_text(text, font_path=FONT_PATH, max_side=1500, max_ratio=10, margin=80,
+                                  start_font=120, min_font=20, line_spacing=10):
+    words = text.split()
+
+    def wrap(font, max_w):
+        draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+        def w(s):
+            b = draw.textbbox((0, 0), s, font=font)
+            return b[2] - b[0]
+
+        lines, cur = [], ""
+        for word in words:
+            test = word if not cur else cur + " " + word
+            if w(test) <= max_w:
+                cur = test
+            else:
+                if cur:
+                    lines.append(cur)
+                cur = word
+        if cur:
+            lines.append(cur)
+
+        return lines
+
+    for font_size in range(start_font, min_font - 1, -2):
+        font = ImageFont.truetype(font_path, font_size)
+        lines = wrap(font, max_side - 2 * margin)
+
+        draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+        line_h = font.getbbox("Hg")[3]
+        text_w = max(draw.textbbox((0, 0), line, font=font)[2] for line in lines)
+        text_h = len(lines) * line_h + (len(lines) - 1) * line_spacing
+
+        w = int(min(text_w + 2 * margin, max_side))
+        h = int(min(text_h + 2 * margin, max_side))
+
+        if max(w, h) / min(w, h) <= max_ratio:
+            break
+    else:
+        return None
+
+    img = Image.new("RGB", (w, h), "white")
+    draw = ImageDraw.Draw(img)
+    y = int((h - text_h) / 2)
+
+    for line in lines:
+        lw = draw.textbbox((0, 0), line, font=font)[2]
+        draw.text(((w - lw) // 2, y), line, font=font, fill="black")
+        y += line_h + line_spacing
+
+    return img
+
+
+def _count_textbbox(render, titles) -> tuple[int, float]:
+    calls = 0
+    textbbox = ImageDraw.ImageDraw.textbbox
+
+    def counted(self, *args, **kwargs):
+        nonlocal calls
+        calls += 1
+        return textbbox(self, *args, **kwargs)
+
+    ImageDraw.ImageDraw.textbbox = counted
+    try:
+        start = time.perf_counter()
+        for title in titles:
+            render(title)
+        elapsed = time.perf_counter() - start
+    finally:
+        ImageDraw.ImageDraw.textbbox = textbbox
+
+    return calls, elapsed
+
+
+def test_title_images():
+    for title in TITLES:
+        reference = _reference_draw_centered_text(title)
+        image = utils.draw_centered_text(title)
+        assert reference.size == image.size and reference.tobytes() == image.tobytes(), title
+
+    print("draw_centered_text matches the reference")
+
+
+def benchmark_title_images(repeat: int = 5):
+    titles = TITLES * repeat
+
+    utils.get_font.cache_clear()
+    utils.get_text_bbox.cache_clear()
+
+    for name, render in (
+            ("reference", _reference_draw_centered_text),
+            ("cached", utils.draw_centered_text),
+    ):
+        calls, elapsed = _count_textbbox(render, titles)
+        print(f"{name}: {calls} textbbox calls, {elapsed * 1000:.1f} ms for {len(titles)} titles")
+
+
+if __name__ == "__main__":
+    test_images_by_api()
+    test_concurrent_lookups_batched()
+    test_failed_image_page_not_cached()
+    test_title_images()
+    benchmark_title_images()
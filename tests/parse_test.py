@@ -0,0 +1,626 @@
+import asyncio
+import copy
+import json
+import os
+import time
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlparse
+
+from bs4.builder import builder_registry
+
+import parse
+import utils
+from fetch import get_request, close_http
+from filter import fetch_skip_prefixes
+from models import Article, ArticleContext, Config, Image, NotAnArticleError
+from parse import parse_article_page, parse_image_page, get_trimmed_text, _content_key
+from models import ParagraphResult
+from parsers import LANG_PARSERS, LANG_FINDER_CONFIG, ARTICLE_PARSE_ONLY, extract_featured_titles
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages")
+INDEX_PATH = os.path.join(PAGES_DIR, "index.json")
+
+FAST_PARSER = "lxml"
+
+# По одной статье на каждый парсер из LANG_PARSERS
+ARTICLES = {
+    "ru": "https://ru.wikipedia.org/wiki/Меркурий",
+    "en": "https://en.wikipedia.org/wiki/Mercury_(planet)",
+    "fr": "https://fr.wikipedia.org/wiki/Mercure_(planète)",
+    "de": "https://de.wikipedia.org/wiki/Merkur_(Planet)",
+    "es": "https://es.wikipedia.org/wiki/Mercurio_(planeta)",
+    "it": "https://it.wikipedia.org/wiki/Mercurio_(astronomia)",
+    "pt": "https://pt.wikipedia.org/wiki/Mercúrio_(planeta)",
+    "pl": "https://pl.wikipedia.org/wiki/Merkury",
+}
+
+FRAGMENTS = [
+    '<a href="/wiki/User:Marvel">Marvel</a> (<a href="//commons.wikimedia.org/wiki/User_talk:Marvel">talk</a>)',
+    'NASA/Johns Hopkins University Applied Physics Laboratory',
+    '<span lang="en"><a href="https://photojournal.jpl.nasa.gov/catalog/PIA11245">PIA11245</a></span>',
+    '<p>Own work<br>Diego Delso</p>',
+]
+
+
+# =========================
+# FIXTURES
+# =========================
+# Страницы записываются с живой Википедии при первом запуске этого файла как скрипта,
+# поэтому проверки ниже называются check_*, а не test_*: pytest их не собирает.
+def _path(name: str) -> str:
+    return os.path.join(PAGES_DIR, name)
+
+
+def _load_index() -> dict:
+    if not os.path.exists(INDEX_PATH):
+        return {}
+
+    with open(INDEX_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+async def _record(name: str, url: str, index: dict):
+    """
+    Отсутствующие страницы скачиваются один раз и дальше берутся с диска.
+    """
+    if os.path.exists(_path(name)) and name in index:
+        return
+
+    response = await get_request(url)
+    if response.status_code != 200:
+        raise RuntimeError(f"Can't record {url}: {response.status_code}")
+
+    with open(_path(name), "w", encoding="utf-8") as f:
+        f.write(response.text)
+
+    index[name] = response.url
+
+
+def _read(name: str) -> str:
+    with open(_path(name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+async def record_fixtures() -> dict:
+    os.makedirs(PAGES_DIR, exist_ok=True)
+    index = _load_index()
+
+    try:
+        for lang, url in ARTICLES.items():
+            await _record(f"{lang}-article.html", url, index)
+
+            # страница File: берётся из самой статьи, чтобы проверить и parse_image_page
+            parsed = parse_article_page(_read(f"{lang}-article.html"), index[f"{lang}-article.html"], lang, "", True)
+            if parsed.image_page_url:
+                await _record(f"{lang}-file.html", parsed.image_page_url, index)
+
+        for lang, cfg in LANG_FINDER_CONFIG.items():
+            await _record(f"{lang}-featured.html", cfg["url"], index)
+
+            if f"{lang}-skip" not in index:
+                index[f"{lang}-skip"] = list(await fetch_skip_prefixes(lang))
+    finally:
+        await close_http()
+
+        with open(INDEX_PATH, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+
+    return index
+
+
+# =========================
+# EQUIVALENCE
+# =========================
+def _collect(index: dict) -> dict:
+    results = {}
+
+    for lang in LANG_PARSERS:
+        name = f"{lang}-article.html"
+        parsed = parse_article_page(_read(name), index[name], lang, "", True)
+        results[name] = parsed
+
+        name = f"{lang}-file.html"
+        if name in index:
+            ctx = ArticleContext(lang=lang, url_or_title=ARTICLES[lang], with_image=True, cached=False)
+            results[name] = parse_image_page(_read(name), index[name], ctx)
+
+    for lang in LANG_FINDER_CONFIG:
+        name = f"{lang}-featured.html"
+        results[name] = extract_featured_titles(lang, _read(name), tuple(index[f"{lang}-skip"]))
+
+    for i, fragment in enumerate(FRAGMENTS):
+        results[f"fragment-{i}"] = (utils.update_links("commons.wikimedia.org", fragment), utils.has_link(fragment))
+
+    return results
+
+
+def check_parser_equivalence(index: dict):
+    assert builder_registry.lookup(FAST_PARSER), f"{FAST_PARSER} is not installed"
+
+    default_parser = utils.HTML_PARSER
+
+    try:
+        utils.HTML_PARSER = "html.parser"
+        reference = _collect(index)
+
+        utils.HTML_PARSER = FAST_PARSER
+        fast = _collect(index)
+    finally:
+        utils.HTML_PARSER = default_parser
+
+    failed = [name for name in reference if reference[name] != fast[name]]
+    for name in failed:
+        print(f"MISMATCH {name}:\n  html.parser: {reference[name]!r}\n  {FAST_PARSER}: {fast[name]!r}")
+
+    assert not failed, failed
+    print(f"{FAST_PARSER} matches html.parser on {len(reference)} cases")
+
+
+def check_strainer_equivalence(index: dict):
+    """
+    Разбор только нужных поддеревьев (ARTICLE_PARSE_ONLY, parse_only в LANG_FINDER_CONFIG)
+    должен давать тот же результат, что и разбор всей страницы.
+    """
+    article_parse_only = parse.ARTICLE_PARSE_ONLY
+    finder_parse_only = {lang: cfg.pop("parse_only", None) for lang, cfg in LANG_FINDER_CONFIG.items()}
+
+    try:
+        parse.ARTICLE_PARSE_ONLY = None
+        full = _collect(index)
+    finally:
+        parse.ARTICLE_PARSE_ONLY = article_parse_only
+        for lang, parse_only in finder_parse_only.items():
+            if parse_only is not None:
+                LANG_FINDER_CONFIG[lang]["parse_only"] = parse_only
+
+    strained = _collect(index)
+
+    failed = [name for name in full if full[name] != strained[name]]
+    for name in failed:
+        print(f"MISMATCH {name}:\n  full: {full[name]!r}\n  parse_only: {strained[name]!r}")
+
+    assert not failed, failed
+    print(f"parse_only matches full parse on {len(full)} cases")
+
+
+# =========================
+# CLEAN_SOUP / GET_PARAGRAPHS
+# =========================
+# Прежние реализации (несколько проходов) — эталон для сравнения и бенчмарка
+def _reference_clean_soup(soup):
+    for tag in soup.find_all(True):
+        if not tag.decomposed and utils.is_hidden(tag):
+            tag.decompose()
+
+    for table in soup.find_all('table'):
+        if table.decomposed:
+            continue
+
+        img = table.select_one('a[href] img')
+
+        if img and img.parent and img.parent.name == 'a':
+            table.replace_with(copy.copy(img.parent))
+        else:
+            table.decompose()
+
+    return soup
+
+
+def _reference_get_paragraphs(soup) -> ParagraphResult:
+    def select_list(selector):
+        return [q for p in soup.select(selector) if (q := p.get_text().strip())]
+
+    paragraphs = select_list(':scope > * > p') or select_list(':scope > p') or select_list('p')
+    result = ParagraphResult(paragraphs=paragraphs)
+
+    if soup.select_one('div.ts-disambig'):
+        result.is_disambig = True
+
+        for a in soup.select('a[rel="mw:WikiLink"]'):
+            href = a.get('href')
+            if not href or parse_qs(urlparse(href).query).get('redlink') == ['1']:
+                continue
+            result.titles.append(utils.get_title_by_url(href))
+
+    return result
+
+
+def _article_soups(index: dict) -> dict:
+    return {
+        lang: utils.make_soup(_read(f"{lang}-article.html"), ARTICLE_PARSE_ONLY)
+        for lang in LANG_PARSERS
+    }
+
+
+def check_clean_soup_equivalence(index: dict):
+    for lang, soup in _article_soups(index).items():
+        reference = _reference_clean_soup(copy.copy(soup))
+        cleaned = utils.clean_soup(soup)
+        assert str(reference) == str(cleaned), lang
+
+        blocks = cleaned.find_all('div')
+        reference_blocks = reference.find_all('div')
+        for block, reference_block in zip(blocks, reference_blocks):
+            assert utils.get_paragraphs(block) == _reference_get_paragraphs(reference_block), (lang, block.get('id'))
+
+    print("clean_soup / get_paragraphs match the reference implementation")
+
+
+def benchmark_clean_soup(index: dict, repeat: int = 5):
+    soups = _article_soups(index)
+
+    for name, clean, paragraphs in (
+            ("reference", _reference_clean_soup, _reference_get_paragraphs),
+            ("single-pass", utils.clean_soup, utils.get_paragraphs),
+    ):
+        elapsed = 0.0
+
+        for _ in range(repeat):
+            for soup in soups.values():
+                soup = copy.copy(soup)
+
+                start = time.perf_counter()
+                main_block = clean(soup).find('div', id='mw-content-text')
+                paragraphs(main_block)
+                elapsed += time.perf_counter() - start
+
+        print(f"{name}: {elapsed / repeat * 1000:.1f} ms per {len(soups)} articles")
+
+
+# =========================
+# GET_TRIMMED_TEXT
+# =========================
+def _reference_get_trimmed_text(paragraphs: list[str], max_length: int) -> str:
+    total_length, text = 0, ''
+
+    for paragraph in paragraphs:
+        paragraph = utils.remove_brackets_by_rules(paragraph)
+        paragraph_length = len(paragraph) + 2
+
+        text += paragraph
+
+        if total_length + paragraph_length > max_length:
+            ok, i = False, max_length - 2
+            t = text[:i]
+
+            while not ok:
+                t = str(t[:i].rsplit('.', 1)[0])
+
+                while utils.ends_with_one_char_abbr(t):
+                    split = t.rsplit('.', 1)
+                    if len(split) == 1:
+                        return t + '.\n\n'
+                    t = split[0]
+
+                ok, i = utils.is_balanced(t)
+
+            return t + '.\n\n'
+
+        text += '\n\n'
+        total_length += paragraph_length
+
+    return text
+
+
+# худшие случаи прежнего алгоритма: много точек внутри скобок и однобуквенные сокращения
+SYNTHETIC_CAPTIONS = {
+    "brackets": "Start. " + "(x. y) " * 1000 + " (open z. " + "w. " * 1000,
+    "abbr": "Sentence ends here. " + "B. " * 2000,
+    "quotes": "«Quote. " * 500 + "„inner. “ » " * 500,
+}
+
+
+def _caption_corpus(index: dict) -> list[list[str]]:
+    corpus = [[caption] for caption in SYNTHETIC_CAPTIONS.values()]
+
+    for lang in LANG_PARSERS:
+        name = f"{lang}-article.html"
+        parsed = parse_article_page(_read(name), index[name], lang, "", False)
+        if parsed.article:
+            corpus.append(parsed.article.paragraphs)
+
+    return corpus
+
+
+def check_trimmed_text_equivalence(index: dict):
+    corpus = _caption_corpus(index)
+
+    for paragraphs in corpus:
+        for max_length in (64, 200, 1024, 2000, 4096):
+            expected = _reference_get_trimmed_text(paragraphs, max_length)
+            assert get_trimmed_text(paragraphs, max_length) == expected, (paragraphs[0][:50], max_length)
+
+    print(f"get_trimmed_text matches the reference on {len(corpus)} captions")
+
+
+def benchmark_trimmed_text(index: dict, repeat: int = 20):
+    corpus = _caption_corpus(index)
+
+    for max_length in (1024, 4096):
+        for name, trim in (("reference", _reference_get_trimmed_text), ("linear", get_trimmed_text)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for paragraphs in corpus:
+                    trim(paragraphs, max_length)
+            elapsed = time.perf_counter() - start
+
+            print(f"{name} {max_length}: {elapsed / repeat * 1000:.2f} ms per {len(corpus)} captions")
+
+
+# =========================
+# REVALIDATE
+# =========================
+def check_revalidate_content_key(index: dict):
+    """
+    Ревалидация перезаписывает строку, только если изменилось содержимое, а не file_id картинки.
+    """
+    for lang in LANG_PARSERS:
+        name = f"{lang}-article.html"
+        article = parse_article_page(_read(name), index[name], lang, "", True).article
+        article.image = Image(
+            desc="https://upload.wikimedia.org/example.jpg",
+            licenses=["CC BY-SA"],
+            page_url="https://commons.wikimedia.org/wiki/File:Example.jpg",
+            author_html="Author",
+            is_animation=False,
+        )
+
+        stored = copy.deepcopy(article)
+        stored.image.desc = "AgACAgIAAxkBAAI"  # file_id после отправки в Telegram
+        stored.captions = {"key": "caption"}
+        assert _content_key(stored) == _content_key(article), lang
+
+        changed = copy.deepcopy(stored)
+        changed.paragraphs = changed.paragraphs + ["New paragraph."]
+        assert _content_key(changed) != _content_key(article), lang
+
+        changed = copy.deepcopy(stored)
+        changed.image.page_url = "https://commons.wikimedia.org/wiki/File:Other.jpg"
+        assert _content_key(changed) != _content_key(article), lang
+
+    print("revalidate compares content without file_id")
+
+
+# =========================
+# OFFLINE (синтетические страницы из tests/fixtures/offline, запускаются pytest)
+# =========================
+OFFLINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "offline")
+
+OFFLINE_PAGES = {
+    "ru-article.html": "https://ru.wikipedia.org/wiki/Меркурий",
+    "ru-disambig.html": "https://ru.wikipedia.org/wiki/Меркурий_(значения)",
+}
+
+
+def _read_offline(name: str) -> str:
+    with open(os.path.join(OFFLINE_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _parse_offline() -> dict:
+    return {
+        name: parse_article_page(_read_offline(name), url, "ru", "", True)
+        for name, url in OFFLINE_PAGES.items()
+    }
+
+
+def test_parse_article_page_offline():
+    parsed = _parse_offline()
+
+    article = parsed["ru-article.html"].article
+    assert article.title == "Меркурий"
+    assert article.link == utils.quote_url(OFFLINE_PAGES["ru-article.html"])
+    assert len(article.paragraphs) == 4
+    assert article.paragraphs[0].startswith("Меркýрий — наименьшая планета Солнечной системы")
+    assert not any("Скрытый" in p or "Навигация" in p or "лицензии" in p for p in article.paragraphs)
+    assert not article.is_disambig
+    assert parsed["ru-article.html"].image_page_url.endswith(":Mercury_in_color_-_Prockter07_centered.jpg")
+
+    disambig = parsed["ru-disambig.html"].article
+    assert disambig.is_disambig
+    assert disambig.disambig_titles == ["Меркурий", "Меркурий (мифология)"]
+    assert parsed["ru-disambig.html"].image_page_url is None
+
+    # заголовок совпал с последней статьёй — статьи нет
+    assert parse_article_page(_read_offline("ru-article.html"), OFFLINE_PAGES["ru-article.html"], "ru", "Меркурий",
+                              True).article is None
+
+
+def test_offline_equivalence():
+    """
+    То же, что check_*_equivalence, но на синтетических страницах: SoupStrainer, бэкенд и однопроходные
+    clean_soup / get_paragraphs не меняют результат.
+    """
+    strained = _parse_offline()
+
+    article_parse_only = parse.ARTICLE_PARSE_ONLY
+    try:
+        parse.ARTICLE_PARSE_ONLY = None
+        assert _parse_offline() == strained
+    finally:
+        parse.ARTICLE_PARSE_ONLY = article_parse_only
+
+    default_parser = utils.HTML_PARSER
+    try:
+        for backend in ("html.parser", FAST_PARSER):
+            utils.HTML_PARSER = backend
+            assert _parse_offline() == strained, backend
+    finally:
+        utils.HTML_PARSER = default_parser
+
+    for name in OFFLINE_PAGES:
+        soup = utils.make_soup(_read_offline(name), ARTICLE_PARSE_ONLY)
+        reference = _reference_clean_soup(copy.copy(soup))
+        cleaned = utils.clean_soup(soup)
+        assert str(reference) == str(cleaned), name
+
+        block = cleaned.find("div", id="mw-content-text")
+        assert utils.get_paragraphs(block) == _reference_get_paragraphs(reference.find("div", id="mw-content-text"))
+
+
+
+
+# синтетические подписи для get_trimmed_text: проверяются pytest без записанных страниц
+TRIM_CASES = {
+    "abbreviations": ["Работа А. С. Пушкина. Издана в 1830 г. в Москве. Автор — Н. В. Гоголь, " * 20],
+    "brackets": ["Планета (от греч. «странник». Устар.) и спутник [см. ниже. Прим.] обращаются. " * 20],
+    "unclosed bracket": ["Начало. Конец первой фразы (скобка не закрыта. Дальше. " + "слово " * 100],
+    "mismatched brackets": ["Фраза. Вторая (скобка] и ещё. " + "текст. " * 50],
+    "no sentence end": ["слово " * 200],
+    "single letter only": ["A. B. C. D. " * 50],
+    "shorter than limit": ["Коротко. Очень коротко.", "Второй абзац."],
+    "several paragraphs": ["Первый абзац. Ещё фраза.", "Второй абзац (с пояснением. внутри). " * 10, "Третий."],
+    **{name: [caption] for name, caption in SYNTHETIC_CAPTIONS.items()},
+}
+
+
+def test_trimmed_text_offline():
+    for name, paragraphs in TRIM_CASES.items():
+        for max_length in (16, 64, 200, 1024, 4096):
+            expected = _reference_get_trimmed_text(paragraphs, max_length)
+            assert get_trimmed_text(paragraphs, max_length) == expected, (name, max_length)
+
+    # короче лимита — текст целиком, без обрезки
+    paragraphs = TRIM_CASES["shorter than limit"]
+    assert get_trimmed_text(paragraphs, 1024) == "\n\n".join(paragraphs) + "\n\n"
+
+
+# =========================
+# LOAD ARTICLE (без сети и БД: build_article и запись в БД подменяются)
+# =========================
+LOAD_URL = "https://ru.wikipedia.org/wiki/Меркурий"
+
+
+@contextmanager
+def _patched(module, **values):
+    original = {name: getattr(module, name) for name in values}
+    try:
+        for name, value in values.items():
+            setattr(module, name, value)
+        yield
+    finally:
+        for name, value in original.items():
+            setattr(module, name, value)
+
+
+def _load_config(**kwargs) -> Config:
+    return Config(TELEGRAM_CHANNELS=[], RULES_URL="", LANG_CODE="ru", WIKI_URL_OR_NAME=LOAD_URL, **kwargs)
+
+
+def _load_article_stub(link: str = LOAD_URL) -> Article:
+    return Article(
+        title="Меркурий",
+        paragraphs=["Меркурий — наименьшая планета Солнечной системы."],
+        link=utils.quote_url(link),
+        image=None,
+        is_disambig=False,
+        disambig_titles=[],
+    )
+
+
+def _recording_db(calls: list) -> dict:
+    async def save_article_to_db(article):
+        calls.append(("save", article.link))
+
+    async def set_cached_final_url(url_start, url_final):
+        calls.append(("final_url", url_start, url_final))
+
+    async def set_http_cache_article_link(url, link):
+        calls.append(("http_cache", url, link))
+
+    async def update_featured_articles_in_db(lang, titles):
+        calls.append(("featured", lang, titles))
+
+    return dict(
+        save_article_to_db=save_article_to_db,
+        set_cached_final_url=set_cached_final_url,
+        set_http_cache_article_link=set_http_cache_article_link,
+        update_featured_articles_in_db=update_featured_articles_in_db,
+    )
+
+
+def test_unchanged_page_updates_featured():
+    """
+    304 (страница не изменилась): статья не перезаписывается, но заголовок всё равно попадает в featured_articles.
+    """
+    calls = []
+    article = _load_article_stub()
+
+    async def build_article(url, ctx, last_title=''):
+        return copy.deepcopy(article), True
+
+    ctx = ArticleContext(lang="ru", url_or_title=LOAD_URL, with_image=False, cached=False)
+    config = _load_config(USE_AND_UPDATE_LAST_FEATURED_TITLE=True)
+
+    with _patched(parse, build_article=build_article, **_recording_db(calls)):
+        loaded = asyncio.run(parse._load_article(config, ctx, LOAD_URL, "Венера"))
+
+    assert loaded == article
+    assert calls == [("featured", "ru", {"Меркурий"})]
+
+
+
+def test_not_article_rejected_on_first_and_repeat_request():
+    """
+    Страница, не проходящая is_article, отклоняется одинаково: первый запрос загружает её и записывает
+    not_article в negative_cache, повтор получает тот же отказ без обращения к Википедии.
+    """
+    calls, negatives, built = [], {}, []
+    category = "https://ru.wikipedia.org/wiki/Категория:Планеты"
+
+    async def build_article(url, ctx, last_title=''):
+        built.append(url)
+        return _load_article_stub(category), False
+
+    async def is_article(lang, url):
+        return "Категория" not in utils.unquote_url(url)
+
+    async def resolve_cached_article(url_start, lang, with_image, *, with_last_title=True):
+        return None, '' if with_last_title else None, negatives.get(url_start)
+
+    async def save_negative_result(url, reason, ttl_minutes):
+        negatives[url] = reason
+
+    async def delete_negative_result(url):
+        negatives.pop(url, None)
+
+    async def request_twice() -> list[type]:
+        errors = []
+        for _ in range(2):
+            try:
+                await parse.get_article(_load_config())
+            except Exception as exc:
+                errors.append(type(exc))
+        return errors
+
+    with _patched(
+            parse,
+            build_article=build_article,
+            is_article=is_article,
+            resolve_cached_article=resolve_cached_article,
+            save_negative_result=save_negative_result,
+            delete_negative_result=delete_negative_result,
+            **_recording_db(calls),
+    ):
+        errors = asyncio.run(request_twice())
+
+    assert errors == [NotAnArticleError, NotAnArticleError]
+    assert len(built) == 1
+    assert list(negatives.values()) == ["not_article"]
+    assert calls == []
+
+
+if __name__ == "__main__":
+    fixtures = asyncio.run(record_fixtures())
+    check_strainer_equivalence(fixtures)
+    check_parser_equivalence(fixtures)
+    check_clean_soup_equivalence(fixtures)
+    benchmark_clean_soup(fixtures)
+    check_trimmed_text_equivalence(fixtures)
+    benchmark_trimmed_text(fixtures)
+    check_revalidate_content_key(fixtures)
+    test_parse_article_page_offline()
+    test_offline_equivalence()
+    test_trimmed_text_offline()
+    test_unchanged_page_updates_featured()
+    test_not_article_rejected_on_first_and_repeat_request()
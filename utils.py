@@ -4,29 +4,24 @@ import html
 import logging
 import os
 import re
+from bisect import bisect_left
 from datetime import datetime, UTC, timezone
+from functools import lru_cache
 from io import BytesIO
 from typing import Optional
 from urllib.parse import urlparse, unquote, quote, parse_qs
 
 import psutil
-import requests
 from PIL import Image, ImageDraw, ImageFont
-from bs4 import Tag, BeautifulSoup
+from bs4 import Tag, BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
 from bs4.element import PageElement, NavigableString
-from requests import Response
 
-from constants import User_Agent, FONT_PATH
+from constants import FONT_PATH, HTML_PARSER
 from i18n import TRANSLATIONS
 from models import ArticleContext, ParagraphResult
 
 
-# Добавляем хэдер, чтобы соблюсти Wikimedia Foundation User-Agent Policy
-def get_request(url: str) -> Response:
-    headers = {'User-Agent': User_Agent}
-    return requests.get(url, headers=headers, allow_redirects=True)
-
-
 def unquote_url(url: str) -> str:
     return unquote(url)
 
@@ -90,94 +85,172 @@ def join_url(netloc: str, path: str) -> str:
         return f'https://{netloc}{path}'
 
 
+@lru_cache
+def _resolve_html_parser(name: str) -> str:
+    if builder_registry.lookup(name) is None:
+        logger.warning("HTML parser %r is not available, falling back to html.parser", name)
+        return 'html.parser'
+    return name
+
+
+def make_soup(html_code: str, parse_only: SoupStrainer | None = None) -> BeautifulSoup:
+    """
+    Разбор целой HTML-страницы бэкендом из HTML_PARSER.
+    """
+    return BeautifulSoup(html_code, _resolve_html_parser(HTML_PARSER), parse_only=parse_only)
+
+
+def make_fragment(html_code: str) -> Tag:
+    """
+    Разбор фрагмента HTML (подпись автора, источник и т.п.).
+    Исходная разметка фрагмента — fragment.decode_contents().
+    """
+    parser = _resolve_html_parser(HTML_PARSER)
+    if parser == 'html.parser':
+        return BeautifulSoup(html_code, parser)
+
+    # lxml достраивает вокруг фрагмента <html><body><p>, поэтому разбираем его внутри div
+    return BeautifulSoup(f'<div>{html_code}</div>', parser).div
+
+
 def has_link(html_code: str) -> bool:
     if not html_code:
         return False
-    soup = BeautifulSoup(html_code, 'html.parser')
-    return soup.find('a', href=True) is not None
+    fragment = make_fragment(html_code)
+    return fragment.find('a', href=True) is not None
 
 
-def clean_select_list(soup: PageElement | Tag | NavigableString | None | int, selector: str) -> list[str]:
-    return [q for p in soup.select(selector) if (q := p.get_text().strip())]
+# Правила скрытых элементов собираются один раз (общие для всех языков)
+HIDDEN_ROLES = frozenset({"note", "presentation"})
+HIDDEN_CLASSES = frozenset({"noprint", "hidden", "metadata", "infobox-above", "ts-doc-footer", "ts-doc-doc"})
 
 
 def get_paragraphs(
         soup: PageElement | Tag | NavigableString | None | int
 ) -> ParagraphResult:
-    paragraphs = clean_select_list(soup, ':scope > * > p')
+    """
+    Один обход поддерева: абзацы-внуки (:scope > * > p), абзацы-дети (:scope > p), все абзацы,
+    плюс признак неоднозначности и ссылки для него. Приоритет уровней — как раньше.
+    """
+    grandchildren, children, everything = [], [], []
+    wiki_links = []
+    is_disambig = False
 
-    if not paragraphs:
-        paragraphs = clean_select_list(soup, ':scope > p')
+    for tag in soup.descendants:
+        if not isinstance(tag, Tag):
+            continue
 
-    if not paragraphs:
-        paragraphs = clean_select_list(soup, 'p')
+        name = tag.name
 
-    result = ParagraphResult(paragraphs=paragraphs)
+        if name == 'p':
+            everything.append(tag)
+            parent = tag.parent
+
+            if parent is soup:
+                children.append(tag)
+            elif parent is not None and parent.parent is soup:
+                grandchildren.append(tag)
 
-    if soup and isinstance(soup, (Tag, PageElement)):
-        disambig = soup.select_one('div.ts-disambig')
+        elif name == 'a':
+            rel = tag.get('rel')
+            if isinstance(rel, list):
+                rel = ' '.join(rel)
+            if rel == 'mw:WikiLink':
+                wiki_links.append(tag)
 
-        if disambig:
-            result.is_disambig = True
+        elif name == 'div' and not is_disambig:
+            is_disambig = 'ts-disambig' in _attr_list(tag, 'class', lower=False)
 
-            for a in soup.select('a[rel="mw:WikiLink"]'):
-                href = a.get('href')
+    paragraphs = []
+    for candidates in (grandchildren, children, everything):
+        paragraphs = [q for p in candidates if (q := p.get_text().strip())]
+        if paragraphs:
+            break
+
+    result = ParagraphResult(paragraphs=paragraphs)
 
-                if not href:
-                    continue
+    if is_disambig:
+        result.is_disambig = True
+
+        for a in wiki_links:
+            href = a.get('href')
+
+            if not href:
+                continue
 
-                query = parse_qs(urlparse(href).query)
+            query = parse_qs(urlparse(href).query)
 
-                if query.get('redlink') == ['1']:
-                    continue
+            if query.get('redlink') == ['1']:
+                continue
 
-                result.titles.append(get_title_by_url(href))
+            result.titles.append(get_title_by_url(href))
 
     return result
 
 
-def _attr_list(tag: Tag, attr: str) -> list[str]:
+def _attr_list(tag: Tag, attr: str, lower: bool = True) -> list[str]:
     val = tag.get(attr)
 
     if isinstance(val, str):
-        return val.lower().split()
+        return (val.lower() if lower else val).split()
     if isinstance(val, (list, tuple)):
-        return [v.lower() for v in val if isinstance(v, str)]
+        return [v.lower() if lower else v for v in val if isinstance(v, str)]
 
     return []
 
 
 def is_hidden(tag: Tag) -> bool:
+    attrs = tag.attrs
+    if not attrs:
+        return False
+
     # style="display:none"
-    style = tag.get("style", "").replace(" ", "").lower()
-    if "display:none" in style:
+    style = attrs.get("style")
+    if style and "display:none" in style.replace(" ", "").lower():
         return True
 
     # hidden attribute
-    if tag.has_attr("hidden"):
+    if "hidden" in attrs:
         return True
 
     # role
-    if {"note", "presentation"} & set(_attr_list(tag, "role")):
+    if "role" in attrs and not HIDDEN_ROLES.isdisjoint(_attr_list(tag, "role")):
         return True
 
     # классы
-    if ({"noprint", "hidden", "metadata", "infobox-above", "ts-doc-footer", "ts-doc-doc"}
-            & set(_attr_list(tag, "class"))):
+    if "class" in attrs and not HIDDEN_CLASSES.isdisjoint(_attr_list(tag, "class")):
         return True
 
     return False
 
 
 def clean_soup(soup: BeautifulSoup) -> BeautifulSoup:
-    for tag in soup.find_all(True):
-        if not tag.decomposed and is_hidden(tag):
-            tag.decompose()
+    """
+    Один обход дерева: скрытые элементы удаляются вместе с поддеревом (внутрь не спускаемся),
+    внешние таблицы запоминаются и после очистки заменяются ссылкой-картинкой или удаляются.
+    Вложенные таблицы уходят вместе с внешней.
+    """
+    tables = []
+    stack = [(soup, False)]
 
-    for table in soup.find_all('table'):
-        if table.decomposed:
-            continue
+    while stack:
+        node, in_table = stack.pop()
+
+        for child in tuple(node.contents):
+            if not isinstance(child, Tag):
+                continue
+
+            if is_hidden(child):
+                child.decompose()
+                continue
+
+            if child.name == 'table' and not in_table:
+                tables.append(child)
+                stack.append((child, True))
+            else:
+                stack.append((child, in_table))
 
+    for table in tables:
         img = table.select_one('a[href] img')
 
         if img and img.parent and img.parent.name == 'a':
@@ -382,11 +455,11 @@ def html_to_text(html_code: str) -> str:
 
 
 def update_links(netloc: str, html_code: str) -> str:
-    soup = BeautifulSoup(html_code, 'html.parser')
+    fragment = make_fragment(html_code)
 
     langs = set(TRANSLATIONS.keys())
 
-    for a in soup.find_all('a', href=True):
+    for a in fragment.find_all('a', href=True):
         href = join_url(netloc, a['href'])
 
         # https://en.wikipedia.org/wiki/ru:Статья
@@ -402,7 +475,7 @@ def update_links(netloc: str, html_code: str) -> str:
 
         a['href'] = quote_url(href)
 
-    return str(soup)
+    return fragment.decode_contents()
 
 
 URL_RE = re.compile(r'https://[^\s<>"\']+')
@@ -446,15 +519,80 @@ def visible_length(html_text: str) -> int:
     return len(text)
 
 
-def get_img_buf_by_text(text: str):
+def get_png_by_text(text: str) -> bytes | None:
     img = draw_centered_text(text)
     if not img:
         return None
 
     buf = BytesIO()
     img.save(buf, format="PNG")
-    buf.seek(0)
-    return buf
+    return buf.getvalue()
+
+
+def get_img_buf_by_text(text: str):
+    png = get_png_by_text(text)
+    if not png:
+        return None
+
+    return BytesIO(png)
+
+
+@lru_cache(maxsize=64)
+def get_font(font_path: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(font_path, size)
+
+
+# холст только для измерений (textbbox ничего не рисует)
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+
+@lru_cache(maxsize=8192)
+def get_text_bbox(font_path: str, size: int, text: str) -> tuple[float, float, float, float]:
+    """
+    Измеренные размеры строки для шрифта и кегля: перенос строк и отрисовка
+    одного и того же заголовка больше не вызывают textbbox повторно.
+    """
+    return _MEASURE_DRAW.textbbox((0, 0), text, font=get_font(font_path, size))
+
+
+def _layout_text(
+        words: list[str],
+        font_path: str,
+        font_size: int,
+        max_side: int,
+        margin: int,
+        line_spacing: int,
+) -> tuple[list[str], int, int, int, int]:
+    """
+    Перенос по словам для одного кегля: (строки, ширина, высота картинки, высота текста, высота строки).
+    """
+    def w(s: str) -> float:
+        b = get_text_bbox(font_path, font_size, s)
+        return b[2] - b[0]
+
+    max_w = max_side - 2 * margin
+
+    lines, cur = [], ""
+    for word in words:
+        test = word if not cur else cur + " " + word
+        if w(test) <= max_w:
+            cur = test
+        else:
+            if cur:
+                lines.append(cur)
+            cur = word
+    if cur:
+        lines.append(cur)
+
+    line_h = get_font(font_path, font_size).getbbox("Hg")[3]
+
+    text_w = max(get_text_bbox(font_path, font_size, line)[2] for line in lines)
+    text_h = len(lines) * line_h + (len(lines) - 1) * line_spacing
+
+    img_w = int(min(text_w + 2 * margin, max_side))
+    img_h = int(min(text_h + 2 * margin, max_side))
+
+    return lines, img_w, img_h, text_h, line_h
 
 
 def draw_centered_text(
@@ -469,58 +607,25 @@ def draw_centered_text(
 ) -> Optional[Image.Image]:
     words = text.split()
 
-    def wrap(font, max_w):
-        draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
-
-        def w(s: str) -> float:
-            b = draw.textbbox((0, 0), s, font=font)
-            return b[2] - b[0]
-
-        lines, cur = [], ""
-        for word in words:
-            test = word if not cur else cur + " " + word
-            if w(test) <= max_w:
-                cur = test
-            else:
-                if cur:
-                    lines.append(cur)
-                cur = word
-        if cur:
-            lines.append(cur)
-
-        return lines, w
-
+    # Обычно подходит уже start_font, поэтому кегли перебираются сверху вниз
     for font_size in range(start_font, min_font - 1, -2):
-        font = ImageFont.truetype(font_path, font_size)
-
-        max_w_guess = max_side - 2 * margin
-        lines, _ = wrap(font, max_w_guess)
-
-        draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
-
-        line_h = font.getbbox("Hg")[3]
-
-        text_w = max(
-            draw.textbbox((0, 0), line, font=font)[2]
-            for line in lines
-        )
-        text_h = len(lines) * line_h + (len(lines) - 1) * line_spacing
-
-        w = int(min(text_w + 2 * margin, max_side))
-        h = int(min(text_h + 2 * margin, max_side))
-
-        if max(w, h) / min(w, h) <= max_ratio:
+        layout = _layout_text(words, font_path, font_size, max_side, margin, line_spacing)
+        _, img_w, img_h, _, _ = layout
+        if max(img_w, img_h) / min(img_w, img_h) <= max_ratio:
             break
     else:
         return None
 
+    font = get_font(font_path, font_size)
+    lines, w, h, text_h, line_h = layout
+
     img = Image.new("RGB", (w, h), "white")
     draw = ImageDraw.Draw(img)
 
     y = int((h - text_h) / 2)
 
     for line in lines:
-        lw = draw.textbbox((0, 0), line, font=font)[2]
+        lw = get_text_bbox(font_path, font_size, line)[2]
         draw.text(
             ((w - lw) // 2, y),
             line,
@@ -564,6 +669,65 @@ def is_balanced(s: str) -> tuple[bool, int]:
     return True, -1
 
 
+BRACKET_PAIRS = {")": "(", "»": "«", "“": "„"}
+BRACKET_OPENING = frozenset(BRACKET_PAIRS.values())
+BRACKET_RE = re.compile('[()«»„“]')
+
+
+def cut_at_sentence(text: str, end: int) -> str:
+    """
+    Обрезка text[:end] по концу предложения: последняя точка, не после однобуквенного сокращения,
+    и без незакрытых скобок (как is_balanced). Все кандидаты — префиксы text, поэтому состояние скобок
+    индексируется один раз, а точки ищутся rfind только левее предыдущей точки обрезки.
+    """
+    # positions[e] — позиция e-й скобки, bottoms[e] — нижняя незакрытая скобка после неё (-1 — нет)
+    positions, bottoms = [], []
+    # первая лишняя или несовпадающая закрывающая скобка и то, что для неё вернёт is_balanced
+    error_at, error_pos = len(text), -1
+
+    stack = []
+    for m in BRACKET_RE.finditer(text):
+        k, ch = m.start(), m.group()
+
+        if ch in BRACKET_OPENING:
+            stack.append((k, ch))
+        elif not stack:
+            error_at, error_pos = k, k
+            break
+        elif stack[-1][1] != BRACKET_PAIRS[ch]:
+            error_at, error_pos = k, stack[0][0]
+            break
+        else:
+            stack.pop()
+
+        positions.append(k)
+        bottoms.append(stack[0][0] if stack else -1)
+
+    i = end
+    while True:
+        # t = t[:i].rsplit('.', 1)[0]
+        dot = text.rfind('.', 0, i)
+        j = dot if dot != -1 else i
+
+        while ends_with_one_char_abbr(text[max(j - 2, 0):j]):
+            dot = text.rfind('.', 0, j)
+            if dot == -1:
+                return text[:j]
+            j = dot
+
+        # is_balanced(text[:j])
+        if j > error_at:
+            i = error_pos
+            continue
+
+        e = bisect_left(positions, j) - 1
+        if e >= 0 and bottoms[e] != -1:
+            i = bottoms[e]
+            continue
+
+        return text[:j]
+
+
 def get_today():
     return datetime.now(UTC).strftime("%Y-%m-%d")
 
@@ -0,0 +1,176 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+
+from constants import (
+    DB_NAME,
+    DB_TEST_NAME,
+    REVALIDATE_MAX_AGE_HOURS,
+    WARM_CONCURRENCY,
+    WARM_PROGRESS_PATH,
+    WARM_REPORT_EVERY,
+)
+from db import init_db, close_db, get_featured_titles, update_featured_articles_in_db, is_article_stale
+from executor import shutdown_executor
+from fetch import init_http, close_http
+from i18n import TRANSLATIONS
+from models import Config
+from parse import get_article, get_ctx_req_by_config, revalidate_cached_article
+from parsers import fetch_featured_titles
+
+# fetched — загружена и сохранена, revalidated — была устаревшей и сверена с Википедией,
+# fresh — свежая, пропущена, negative — недавняя неудача из negative_cache, failed — ошибка
+FETCHED, REVALIDATED, FRESH, NEGATIVE, FAILED = 'fetched', 'revalidated', 'fresh', 'negative', 'failed'
+
+
+# =========================
+# PROGRESS (чтобы прерванный прогрев продолжился с того же места)
+# =========================
+def load_progress() -> set[tuple[str, str]]:
+    if not os.path.exists(WARM_PROGRESS_PATH):
+        return set()
+
+    done = set()
+    with open(WARM_PROGRESS_PATH, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue  # строка, недописанная при аварийном завершении
+            done.add((item["lang"], item["title"]))
+
+    return done
+
+
+def save_progress(f, lang: str, title: str):
+    f.write(json.dumps({"lang": lang, "title": title}, ensure_ascii=False) + "\n")
+    f.flush()
+
+
+# =========================
+# WARM
+# =========================
+async def get_titles(lang: str) -> list[str]:
+    titles = await get_featured_titles(lang)
+    if titles:
+        return titles
+
+    titles = await fetch_featured_titles(lang)
+    if titles:
+        await update_featured_articles_in_db(lang, titles)
+
+    return sorted(titles or ())
+
+
+async def warm_title(lang: str, title: str, max_age_minutes: int) -> str:
+    cfg = Config(
+        TELEGRAM_CHANNELS=[],
+        RULES_URL="",
+        WIKI_URL_OR_NAME=title,
+        LANG_CODE=lang,
+        WITH_IMAGE=True,
+        SAVE_ARTICLE_TO_DB=True,
+    )
+    ctx_req = await get_ctx_req_by_config(cfg)
+
+    if ctx_req.cached:
+        if not await is_article_stale(ctx_req.url, max_age_minutes):
+            return FRESH
+
+        await revalidate_cached_article(ctx_req.url)
+        return REVALIDATED
+
+    if ctx_req.negative:
+        return NEGATIVE
+
+    article, _ = await get_article(cfg, ctx_req=ctx_req)
+    return FETCHED if article else FAILED
+
+
+async def warm(langs: list[str], concurrency: int, max_age_hours: int, restart: bool):
+    if restart and os.path.exists(WARM_PROGRESS_PATH):
+        os.remove(WARM_PROGRESS_PATH)
+
+    done = load_progress()
+
+    queue = []
+    for lang in langs:
+        titles = await get_titles(lang)
+        queue.extend((lang, title) for title in titles if (lang, title) not in done)
+        print(f"{lang}: {len(titles)} featured titles")
+
+    print(f"{len(queue)} to check, {len(done)} already done in a previous run")
+
+    stats: Counter[str] = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+
+    def report():
+        elapsed = time.perf_counter() - start
+        pages = stats[FETCHED] + stats[REVALIDATED]
+        print(
+            f"{sum(stats.values())}/{len(queue)} | "
+            + ", ".join(f"{k}={v}" for k, v in sorted(stats.items()))
+            + f" | {pages / elapsed if elapsed else 0:.2f} pages/s"
+        )
+
+    os.makedirs(os.path.dirname(WARM_PROGRESS_PATH), exist_ok=True)
+
+    with open(WARM_PROGRESS_PATH, "a", encoding="utf-8") as progress:
+        async def worker(lang: str, title: str):
+            async with semaphore:
+                try:
+                    outcome = await warm_title(lang, title, max_age_hours * 60)
+                except Exception as exc:
+                    print(f"{lang}: {title}: {exc}")
+                    outcome = FAILED
+
+            stats[outcome] += 1
+
+            # неудачные не отмечаются — их повторит следующий запуск
+            if outcome != FAILED:
+                save_progress(progress, lang, title)
+
+            if sum(stats.values()) % WARM_REPORT_EVERY == 0:
+                report()
+
+        await asyncio.gather(*(worker(lang, title) for lang, title in queue))
+
+    report()
+
+    # всё пройдено — следующий запуск начнёт заново (свежие статьи пропустит skip-if-fresh)
+    if not stats[FAILED]:
+        os.remove(WARM_PROGRESS_PATH)
+
+
+# =========================
+# ENTRYPOINT
+# =========================
+async def main(args: argparse.Namespace):
+    await init_db(DB_TEST_NAME if args.test else DB_NAME)
+    await init_http()
+
+    try:
+        await warm(args.lang, args.concurrency, args.max_age_hours, args.restart)
+    finally:
+        await close_http()
+        shutdown_executor()
+        await close_db()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Загрузка избранных статей в articles_cache")
+    parser.add_argument("--lang", nargs="+", choices=sorted(TRANSLATIONS.keys()), default=sorted(TRANSLATIONS.keys()))
+    parser.add_argument("--concurrency", type=int, default=WARM_CONCURRENCY)
+    parser.add_argument("--max-age-hours", type=int, default=REVALIDATE_MAX_AGE_HOURS,
+                        help="статьи, сверенные с Википедией позже, пропускаются")
+    parser.add_argument("--restart", action="store_true", help="начать заново, не продолжая прерванный прогрев")
+    parser.add_argument("--test", action="store_true", help="тестовая БД")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))